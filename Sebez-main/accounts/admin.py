@@ -39,9 +39,16 @@ class AccountAdmin(UserAdmin):
 @admin.register(JobSeeker)
 class JobSeekerAdmin(admin.ModelAdmin):
     list_display = ("user", "resume", "visibility")
+    list_select_related = ("user",)
+    search_fields = ("user__email",)
+    raw_id_fields = ("user",)
 
 
 @admin.register(Employer)
 class EmpoyerAdmin(admin.ModelAdmin):
     list_display = ("user", "company_name")
+    list_select_related = ("user",)
+    search_fields = ("company_name",)
+    ordering = ("company_name",)
     prepopulated_fields = {"slug": ["company_name"]}
+    raw_id_fields = ("user",)
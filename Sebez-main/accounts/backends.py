@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password
+
+from . import hashers
+
+UserModel = get_user_model()
+
+
+class ProfileBackend(ModelBackend):
+    """
+    Authentication backend loading the user together with their job seeker
+    or employer profile.
+
+    AuthenticationMiddleware memoizes the user for the whole request, so
+    views can use request.user.jobseeker and request.user.employer_profile
+    without querying the profile again.
+
+    Passwords are checked in the bounded hashing pool of accounts.hashers;
+    authenticate raises hashers.LoginBusy when the pool is saturated.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway, so unknown emails take as long as wrong passwords
+            hashers.run_hashing(make_password, password)
+            return None
+        if not hashers.verify_password(user, password):
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+    def get_user(self, user_id):
+        try:
+            user = UserModel._default_manager.select_related(
+                "jobseeker", "employer_profile"
+            ).get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,227 @@
+"""
+Bulk import of job seeker and employer accounts from CSV rows.
+
+Accounts and their profiles are inserted with bulk_create, in batches of
+one transaction each, instead of one save (plus a profile signal) per
+user. Passwords given in the CSV are hashed in a process pool; accounts
+without one get an unusable password and an invite to choose it through
+the password reset flow. Emails of a batch are sent over a single
+connection once the batch is committed.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.crypto import get_random_string
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from django.utils.text import slugify
+
+from common import utils
+
+from .models import Account, Employer, JobSeeker
+from .tokens import email_confirmation_token
+
+BATCH_SIZE = 1000
+
+FIELDS = ["email", "first_name", "last_name", "account_type", "company_name"]
+
+
+class ImportResult:
+    """Counts of what an import did."""
+
+    def __init__(self):
+        self.created = 0
+        self.skipped = 0
+        self.emails = 0
+        self.errors = []
+
+
+def clean_row(row):
+    """
+    Return the account values of a CSV row, or raise ValueError if the
+    row can't become an account.
+    """
+    values = {field: (row.get(field) or "").strip() for field in FIELDS}
+    if not values["email"]:
+        raise ValueError("Users must have an email address.")
+    if not values["first_name"]:
+        raise ValueError("Users must have first name.")
+    if not values["last_name"]:
+        raise ValueError("Users must have last name.")
+    values["email"] = Account.objects.normalize_email(values["email"])
+    values["account_type"] = int(values["account_type"] or 1)
+    if values["account_type"] not in dict(Account.ACCOUNT_TYPES):
+        raise ValueError(f"Unknown account type {values['account_type']}.")
+    values["password"] = row.get("password") or None
+    return values
+
+
+def hash_passwords(passwords, pool):
+    """Return the hashes of the given passwords, computed in the pool."""
+    if pool is None:
+        return [make_password(password) for password in passwords]
+    return list(pool.map(make_password, passwords, chunksize=50))
+
+
+def employer_slugs(company_names):
+    """Return unique slugs for new employers, without a query per employer."""
+    base_slugs = [
+        slugify(name) or get_random_string(6).lower() for name in company_names
+    ]
+    taken = set(
+        Employer.objects.filter(slug__in=base_slugs).values_list("slug", flat=True)
+    )
+    slugs = []
+    for name, slug in zip(company_names, base_slugs):
+        while slug in taken:
+            slug = slugify(f"{name} {get_random_string(6)}")
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def create_accounts(rows, pool=None):
+    """
+    Insert the accounts described by the cleaned rows with their profiles
+    and return them. Rows with a password become inactive accounts that
+    must verify their email; the others become invited accounts.
+    """
+    passwords = hash_passwords(
+        [row["password"] for row in rows if row["password"]], pool
+    )
+    hashes = iter(passwords)
+    accounts = []
+    for row in rows:
+        account = Account(
+            email=row["email"],
+            first_name=row["first_name"],
+            last_name=row["last_name"],
+            account_type=row["account_type"],
+            uid=utils.generate_uid(),
+            # invited users can't log in before choosing a password through
+            # their invite, which also proves they own the email address
+            is_active=not row["password"],
+        )
+        if row["password"]:
+            account.password = next(hashes)
+        else:
+            account.set_unusable_password()
+        accounts.append(account)
+
+    with transaction.atomic():
+        Account.objects.bulk_create(accounts)
+        if any(account.pk is None for account in accounts):
+            # the database doesn't return the ids of inserted rows
+            ids = dict(
+                Account.objects.filter(
+                    email__in=[account.email for account in accounts]
+                ).values_list("email", "pk")
+            )
+            for account in accounts:
+                account.pk = ids[account.email]
+
+        JobSeeker.objects.bulk_create(
+            JobSeeker(user=account) for account in accounts if account.account_type == 1
+        )
+        employers = [
+            (account, row["company_name"] or account.get_full_name())
+            for account, row in zip(accounts, rows)
+            if account.account_type == 2
+        ]
+        slugs = employer_slugs([company_name for _, company_name in employers])
+        Employer.objects.bulk_create(
+            Employer(user=account, company_name=company_name, slug=slug)
+            for (account, company_name), slug in zip(employers, slugs)
+        )
+    return accounts
+
+
+def account_email(account, domain):
+    """Return the verification or invite email of a new account."""
+    uid = urlsafe_base64_encode(force_bytes(account.pk))
+    if account.has_usable_password():
+        subject = "Verify your email address"
+        template = "accounts/confirm_email.html"
+        token = email_confirmation_token.make_token(account)
+    else:
+        subject = "You are invited to Et Jobs"
+        template = "accounts/invite_email.html"
+        token = default_token_generator.make_token(account)
+    message = render_to_string(
+        template, {"user": account, "domain": domain, "uid": uid, "token": token}
+    )
+    return EmailMessage(subject, message, to=[account.email])
+
+
+def send_emails(accounts, domain, connection):
+    """Send the emails of new accounts over one connection; return how many."""
+    return connection.send_messages(
+        [account_email(account, domain) for account in accounts]
+    )
+
+
+def batches(iterable, size):
+    """Yield lists of at most size items of the iterable."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def import_accounts(rows, domain=None, batch_size=BATCH_SIZE, workers=None):
+    """
+    Import accounts from an iterable of CSV rows (dicts) and return an
+    ImportResult. Emails are sent only when a domain is given.
+
+    Rows whose email is already used, in the database or earlier in the
+    rows, are skipped.
+    """
+    result = ImportResult()
+    seen = set()
+    pool = ProcessPoolExecutor(workers, initializer=django.setup) if workers else None
+    connection = get_connection() if domain else None
+    try:
+        if connection is not None:
+            # one SMTP session for all the emails
+            connection.open()
+        # line 1 is the header
+        for batch in batches(enumerate(rows, start=2), batch_size):
+            cleaned = []
+            for line, row in batch:
+                try:
+                    values = clean_row(row)
+                except ValueError as error:
+                    result.errors.append(f"line {line}: {error}")
+                    continue
+                if values["email"] in seen:
+                    result.skipped += 1
+                    continue
+                seen.add(values["email"])
+                cleaned.append(values)
+
+            existing = set(
+                Account.objects.filter(
+                    email__in=[values["email"] for values in cleaned]
+                ).values_list("email", flat=True)
+            )
+            new_rows = [values for values in cleaned if values["email"] not in existing]
+            result.skipped += len(cleaned) - len(new_rows)
+            if not new_rows:
+                continue
+
+            accounts = create_accounts(new_rows, pool)
+            result.created += len(accounts)
+            if connection is not None:
+                result.emails += send_emails(accounts, domain, connection) or 0
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if connection is not None:
+            connection.close()
+    return result
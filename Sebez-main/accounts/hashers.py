@@ -0,0 +1,97 @@
+"""
+Password hashing policy.
+
+The hasher of new passwords is picked per deployment (see PASSWORD_HASHER
+in the settings) and its cost is tuned by settings as well. Django
+rehashes a password on login when it was hashed by another hasher or
+with other parameters, so changing the policy upgrades users as they log
+in.
+
+Hashing is CPU bound, so password checks run in a small thread pool:
+a burst of logins can keep at most LOGIN_HASH_THREADS threads hashing per
+process, and logins that find LOGIN_HASH_QUEUE_SIZE others already
+waiting are turned away instead of tying up request threads.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    ScryptPasswordHasher,
+    check_password,
+    make_password,
+)
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    """Scrypt hasher with its cost set by the SCRYPT_* settings."""
+
+    work_factor = getattr(
+        settings, "SCRYPT_WORK_FACTOR", ScryptPasswordHasher.work_factor
+    )
+    block_size = getattr(settings, "SCRYPT_BLOCK_SIZE", ScryptPasswordHasher.block_size)
+    parallelism = getattr(
+        settings, "SCRYPT_PARALLELISM", ScryptPasswordHasher.parallelism
+    )
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2 hasher (needs argon2-cffi) with its cost set by ARGON2_* settings."""
+
+    time_cost = getattr(settings, "ARGON2_TIME_COST", Argon2PasswordHasher.time_cost)
+    memory_cost = getattr(
+        settings, "ARGON2_MEMORY_COST", Argon2PasswordHasher.memory_cost
+    )
+    parallelism = getattr(
+        settings, "ARGON2_PARALLELISM", Argon2PasswordHasher.parallelism
+    )
+
+
+class LoginBusy(Exception):
+    """Too many logins are waiting for their password to be checked."""
+
+
+_pool = None
+_slots = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is None:
+            threads = getattr(settings, "LOGIN_HASH_THREADS", 2)
+            queue_size = getattr(settings, "LOGIN_HASH_QUEUE_SIZE", 8)
+            _pool = ThreadPoolExecutor(threads, thread_name_prefix="password-hash")
+            _slots = threading.BoundedSemaphore(threads + queue_size)
+    return _pool, _slots
+
+
+def run_hashing(func, *args):
+    """
+    Run func(*args) in the password hashing pool and return its result.
+    Raise LoginBusy if the pool has too much work queued already.
+    """
+    pool, slots = _get_pool()
+    if not slots.acquire(blocking=False):
+        raise LoginBusy
+    try:
+        return pool.submit(func, *args).result()
+    finally:
+        slots.release()
+
+
+def verify_password(user, password):
+    """
+    Check the password of the user in the hashing pool. If it is correct
+    but was hashed by another hasher or with other parameters than the
+    preferred ones, rehash it and save the new hash.
+    """
+    outdated = []
+    valid = run_hashing(check_password, password, user.password, outdated.append)
+    if outdated:
+        user.password = run_hashing(make_password, password)
+        user.save(update_fields=["password"])
+    return valid
@@ -0,0 +1,103 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from accounts.models import Account
+from jobs.models import Job
+
+FORM = "application/x-www-form-urlencoded"
+HOST = "127.0.0.1"
+
+
+class Command(BaseCommand):
+    """
+    Measure bookmark toggles per second under concurrent clients, through
+    the WSGI handler (a thread per client) and through the ASGI handler
+    (a coroutine per client). The bookmark rate limit is lifted while
+    benchmarking, so every toggle reaches the view.
+    """
+
+    help = "Benchmark the bookmark endpoint through the WSGI and ASGI handlers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=20)
+        parser.add_argument("--requests", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        clients = options["clients"]
+        requests = options["requests"]
+        job_ids = list(Job.objects.filter(status=1).values_list("pk", flat=True)[:50])
+        if not job_ids:
+            raise CommandError("At least one published job is needed.")
+
+        user = Account.objects.create_user(
+            f"bench-{get_random_string(8)}@example.com",
+            "Bench",
+            "Mark",
+            get_random_string(16),
+            account_type=1,
+        )
+        try:
+            login = Client(HTTP_HOST=HOST)
+            login.force_login(user)
+            cookies = login.cookies
+            bodies = [
+                urlencode({"job_id": job_ids[i % len(job_ids)]})
+                for i in range(requests)
+            ]
+
+            # all the clients share one account and IP address
+            limits = override_settings(
+                RATELIMITS={**settings.RATELIMITS, "bookmark": None}
+            )
+            with limits:
+                elapsed = self.run_wsgi(cookies, bodies, clients)
+                self.report("WSGI", requests, clients, elapsed)
+                elapsed = asyncio.run(self.run_asgi(cookies, bodies, clients))
+                self.report("ASGI", requests, clients, elapsed)
+        finally:
+            user.delete()
+
+    def run_wsgi(self, cookies, bodies, clients):
+        url = reverse("accounts:bookmark")
+
+        def worker(share):
+            client = Client(HTTP_HOST=HOST)
+            client.cookies = cookies
+            try:
+                for body in share:
+                    client.post(url, body, content_type=FORM)
+            finally:
+                connections.close_all()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            list(executor.map(worker, [bodies[i::clients] for i in range(clients)]))
+        return time.perf_counter() - start
+
+    async def run_asgi(self, cookies, bodies, clients):
+        url = reverse("accounts:bookmark")
+
+        async def worker(share):
+            client = AsyncClient(HTTP_HOST=HOST)
+            client.cookies = cookies
+            for body in share:
+                await client.post(url, body, content_type=FORM)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(bodies[i::clients]) for i in range(clients)))
+        return time.perf_counter() - start
+
+    def report(self, handler, requests, clients, elapsed):
+        self.stdout.write(
+            f"{handler}: {requests} toggles by {clients} clients in {elapsed:.2f}s "
+            f"({requests / elapsed:.1f} toggles/s)"
+        )
@@ -0,0 +1,106 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hashers, make_password
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from accounts.models import Account
+
+FORM = "application/x-www-form-urlencoded"
+HOST = "127.0.0.1"
+
+
+class Command(BaseCommand):
+    """
+    Measure how many password checks a core does per second with every
+    configured hasher, then how many logins per second the login view
+    serves to concurrent clients through the bounded hashing pool. The
+    login rate limit is lifted while benchmarking, so only the pool turns
+    logins away.
+    """
+
+    help = "Benchmark password hashers and logins per second per core."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--checks", type=int, default=20)
+        parser.add_argument("--clients", type=int, default=20)
+        parser.add_argument("--logins", type=int, default=200)
+
+    def handle(self, *args, **options):
+        self.cores = len(os.sched_getaffinity(0))
+        self.stdout.write(
+            f"{self.cores} cores, {settings.LOGIN_HASH_THREADS} hashing threads"
+        )
+        self.bench_hashers(options["checks"])
+        self.bench_logins(options["clients"], options["logins"])
+
+    def bench_hashers(self, checks):
+        password = get_random_string(16)
+        for hasher in get_hashers():
+            try:
+                encoded = make_password(password, hasher=hasher.algorithm)
+            except ValueError as error:
+                # e.g. argon2-cffi is not installed
+                self.stdout.write(f"{hasher.algorithm}: skipped ({error})")
+                continue
+            start = time.perf_counter()
+            for _ in range(checks):
+                check_password(password, encoded)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{hasher.algorithm}: {elapsed / checks * 1000:.1f} ms per check "
+                f"({checks / elapsed:.1f} checks/s per core)"
+            )
+
+    def bench_logins(self, clients, logins):
+        password = get_random_string(16)
+        user = Account.objects.create_user(
+            f"bench-{get_random_string(8)}@example.com",
+            "Bench",
+            "Mark",
+            password,
+            account_type=1,
+        )
+        url = reverse("accounts:login")
+        body = urlencode({"email": user.email, "password": password})
+
+        def worker(count):
+            statuses = []
+            try:
+                for _ in range(count):
+                    # a new client, so every request logs in again
+                    response = Client(HTTP_HOST=HOST).post(url, body, content_type=FORM)
+                    statuses.append(response.status_code)
+            finally:
+                connections.close_all()
+            return statuses
+
+        shares = [logins // clients + (i < logins % clients) for i in range(clients)]
+        # all the clients log in to one account from one IP address
+        limits = override_settings(RATELIMITS={**settings.RATELIMITS, "signin": None})
+        try:
+            start = time.perf_counter()
+            with limits, ThreadPoolExecutor(max_workers=clients) as executor:
+                statuses = [
+                    status
+                    for result in executor.map(worker, shares)
+                    for status in result
+                ]
+            elapsed = time.perf_counter() - start
+        finally:
+            user.delete()
+
+        succeeded = statuses.count(302)
+        rate = succeeded / elapsed
+        self.stdout.write(
+            f"logins: {succeeded} of {logins} by {clients} clients in "
+            f"{elapsed:.2f}s ({rate:.1f} logins/s, {rate / self.cores:.1f} per core), "
+            f"{statuses.count(503)} turned away"
+        )
@@ -0,0 +1,63 @@
+import csv
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import bulk_import
+
+
+class Command(BaseCommand):
+    """
+    Create job seeker and employer accounts in bulk from a CSV file with
+    the columns email, first_name, last_name and optionally account_type
+    (1 job seeker, 2 employer), company_name and password.
+    """
+
+    help = "Import accounts from a CSV file, hashing passwords in a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_file")
+        parser.add_argument("--batch-size", type=int, default=bulk_import.BATCH_SIZE)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Processes hashing the passwords of the CSV (0 hashes inline).",
+        )
+        parser.add_argument(
+            "--domain",
+            help="Domain used in the links of verification and invite emails.",
+        )
+        parser.add_argument(
+            "--no-email",
+            action="store_true",
+            help="Don't send verification and invite emails.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["no_email"] and not options["domain"]:
+            raise CommandError("--domain is required unless --no-email is given.")
+        domain = None if options["no_email"] else options["domain"]
+
+        started = time.perf_counter()
+        try:
+            with open(options["csv_file"], newline="", encoding="utf-8") as csv_file:
+                result = bulk_import.import_accounts(
+                    csv.DictReader(csv_file),
+                    domain=domain,
+                    batch_size=options["batch_size"],
+                    workers=options["workers"],
+                )
+        except OSError as error:
+            raise CommandError(error)
+
+        for error in result.errors:
+            self.stderr.write(error)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {result.created} accounts, skipped {result.skipped} taken "
+                f"emails and sent {result.emails} emails in {elapsed:.1f}s."
+            )
+        )
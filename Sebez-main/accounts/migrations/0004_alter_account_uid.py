@@ -0,0 +1,42 @@
+# Generated by Django 4.0.4 on 2026-10-19 05:48
+
+from django.db import migrations, models
+from django.db.models import Count
+
+from common import utils
+
+
+def reassign_duplicate_uids(apps, schema_editor):
+    """Give a new UID to accounts sharing theirs, so it can be made unique."""
+    Account = apps.get_model("accounts", "Account")
+    duplicates = (
+        Account.objects.values("uid")
+        .annotate(accounts=Count("pk"))
+        .filter(accounts__gt=1)
+        .values_list("uid", flat=True)
+    )
+    taken = set(Account.objects.values_list("uid", flat=True))
+    for uid in list(duplicates):
+        # the oldest account keeps the UID
+        for account in Account.objects.filter(uid=uid).order_by("pk")[1:]:
+            new_uid = utils.generate_uid()
+            while new_uid in taken:
+                new_uid = utils.generate_uid()
+            taken.add(new_uid)
+            Account.objects.filter(pk=account.pk).update(uid=new_uid)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_alter_jobseeker_resume_alter_jobseeker_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(reassign_duplicate_uids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='account',
+            name='uid',
+            field=models.CharField(max_length=12, unique=True, verbose_name='UID'),
+        ),
+    ]
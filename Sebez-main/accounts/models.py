@@ -1,10 +1,10 @@
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import IntegrityError, models, transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from common import utils
+from common import cache, utils
 
 
 class AccountManager(BaseUserManager):
@@ -48,6 +48,10 @@ class AccountManager(BaseUserManager):
         return self._create_user(email, first_name, last_name, password, **extrafields)
 
 
+# new UIDs tried before giving up on saving an account
+UID_ATTEMPTS = 3
+
+
 class Account(AbstractUser):
     """
     A class implementing a fully featured custom User model with
@@ -65,7 +69,7 @@ class Account(AbstractUser):
     email = models.EmailField("email", max_length=200, unique=True)
     first_name = models.CharField(verbose_name="First Name", max_length=150)
     last_name = models.CharField(verbose_name="Last Name", max_length=150)
-    uid = models.CharField("UID", max_length=12)
+    uid = models.CharField("UID", max_length=12, unique=True)
     is_admin = models.BooleanField(default=False)
     account_type = models.SmallIntegerField(
         verbose_name="Account Type", choices=ACCOUNT_TYPES, default=1
@@ -90,9 +94,21 @@ class Account(AbstractUser):
 
     def save(self, *args, **kwargs):
         """Assign unique UID before saving the user."""
-        if not self.uid:
-            self.uid = utils.generate_uid(self.__class__)
-        return super().save(*args, **kwargs)
+        if self.uid:
+            return super().save(*args, **kwargs)
+
+        for attempt in range(UID_ATTEMPTS):
+            self.uid = utils.generate_uid()
+            try:
+                with transaction.atomic(using=kwargs.get("using")):
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                taken = self.__class__._default_manager.filter(uid=self.uid).exists()
+                if not taken or attempt == UID_ATTEMPTS - 1:
+                    # another constraint failed (e.g. the email is taken)
+                    # or there is no UID left to try
+                    self.uid = ""
+                    raise
 
 
 def get_resume_path(instance, filename):
@@ -171,23 +187,25 @@ class Bookmark(models.Model):
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def create_or_save_profile(sender, instance, created, **kwargs):
+def create_profile(sender, instance, created, **kwargs):
     """
-    Automatically create a user profile after sign up or
-    update it whenever user information is updated.
+    Automatically create the profile of a user after sign up.
+
+    Later saves of the user (e.g. last_login updates on every login) don't
+    touch the profile; views save profile changes themselves.
     """
+    if not created:
+        return
 
     if instance.account_type == 1:
         # Job seeker account
-        if created:
-            JobSeeker.objects.create(user=instance)
-        else:
-            instance.jobseeker.save()
-
+        JobSeeker.objects.create(user=instance)
     elif instance.account_type == 2:
         # Employer account
-        if created:
-            Employer.objects.create(user=instance)
-        else:
-            instance.employer_profile.save()
-        pass
+        Employer.objects.create(user=instance)
+
+
+@receiver(post_save, sender=Employer)
+@receiver(post_delete, sender=Employer)
+def invalidate_employer(sender, instance, **kwargs):
+    cache.bump("employer", instance.pk)
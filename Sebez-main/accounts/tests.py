@@ -1,3 +1,385 @@
-from django.test import TestCase
+import io
+import re
+import tempfile
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from common import ratelimit
+from jobs.tests import JobTestCase
+
+from .backends import ProfileBackend
+from .hashers import LoginBusy
+from .models import Account, Bookmark, Employer, JobSeeker
+from .views import MAX_BOOKMARK_CHANGES
+
+
+class ProfileLoadingTests(JobTestCase):
+    """The profile of the logged in user is loaded once per request."""
+
+    JOB_COUNT = 0
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.seeker = Account.objects.create_user(
+            "seeker@example.com", "Job", "Seeker", "password", account_type=1
+        )
+        cls.create_job("Python developer", location="Addis Ababa")
+
+    def test_get_user_loads_profile(self):
+        user = ProfileBackend().get_user(self.seeker.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(user.jobseeker.user_id, self.seeker.pk)
+
+    def test_job_list_for_job_seeker(self):
+        self.client.force_login(self.seeker)
+        # user and profile, count, page, bookmarks (reported jobs are excluded
+        # by the page query)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("jobs:job-list"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_job_list_for_employer(self):
+        self.client.force_login(self.account)
+        # user and profile, count, page, bookmarks
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("jobs:job-list"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_employer_home(self):
+        self.client.force_login(self.account)
+        # user and profile, published jobs, their applications, draft jobs
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("jobs:employer-home"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_submitted_proposals(self):
+        self.client.force_login(self.seeker)
+        url = reverse("accounts:js-proposals", args=(self.seeker.uid,))
+        # user and profile, count, active and archived applications
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(RATELIMITS={})
+class AccountImportTests(TestCase):
+    """Accounts are created in bulk from a CSV file and emailed."""
+
+    ROWS = [
+        "email,first_name,last_name,account_type,company_name,password",
+        "seeker@example.com,Job,Seeker,1,,secret-password",
+        "hr@acme.example.com,Em,Ployer,2,Acme,",
+        "taken@example.com,Tak,En,1,,",
+        "seeker@EXAMPLE.com,Job,Seeker,1,,",
+        "nameless@example.com,No,,1,,",
+        "admin@example.com,Ad,Min,3,,",
+        "other@example.com,Oth,Er,,,",
+    ]
+
+    def setUp(self):
+        Account.objects.create_user("taken@example.com", "Tak", "En", "password")
+        csv_file = tempfile.NamedTemporaryFile("w", suffix=".csv")
+        self.addCleanup(csv_file.close)
+        csv_file.write("\n".join(self.ROWS) + "\n")
+        csv_file.flush()
+        self.path = csv_file.name
+
+    def run_import(self, *args):
+        out, err = io.StringIO(), io.StringIO()
+        call_command("import_accounts", self.path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_import(self):
+        with CaptureQueriesContext(connection) as queries:
+            out, err = self.run_import(
+                "--domain", "jobs.example.com", "--batch-size", "2", "--workers", "1"
+            )
+        self.assertIn(
+            "Created 3 accounts, skipped 2 taken emails and sent 3 emails", out
+        )
+        self.assertEqual(
+            err.splitlines(),
+            [
+                "line 6: Users must have last name.",
+                "line 7: Unknown account type 3.",
+            ],
+        )
+        # one insert of accounts per batch with new accounts
+        inserts = [
+            query
+            for query in queries.captured_queries
+            if query["sql"].startswith('INSERT INTO "accounts_account"')
+        ]
+        self.assertEqual(len(inserts), 2)
+
+        # hashed in the pool, and verified before the first login
+        seeker = Account.objects.get(email="seeker@example.com")
+        self.assertFalse(seeker.is_active)
+        self.assertTrue(seeker.check_password("secret-password"))
+        self.assertTrue(JobSeeker.objects.filter(user=seeker).exists())
+        employer = Account.objects.get(email="hr@acme.example.com")
+        self.assertTrue(employer.is_active)
+        self.assertFalse(employer.has_usable_password())
+        self.assertEqual(employer.employer_profile.slug, "acme")
+
+        emails = {message.to[0]: message for message in mail.outbox}
+        self.assertEqual(
+            set(emails),
+            {"seeker@example.com", "hr@acme.example.com", "other@example.com"},
+        )
+        self.assertEqual(
+            emails["seeker@example.com"].subject, "Verify your email address"
+        )
+        invite = emails["hr@acme.example.com"]
+        self.assertEqual(invite.subject, "You are invited to Et Jobs")
+        link = re.search(r"http://jobs\.example\.com(\S+)", invite.body).group(1)
+        # a valid password reset link, redirecting to the password form
+        self.assertRedirects(
+            self.client.get(link),
+            link.replace(link.split("/")[-2], "set-password"),
+            fetch_redirect_response=False,
+        )
+
+    def test_without_emails(self):
+        out, _ = self.run_import("--no-email", "--workers", "0")
+        self.assertIn("Created 3 accounts", out)
+        self.assertEqual(mail.outbox, [])
+        with self.assertRaises(CommandError):
+            self.run_import()
+
+
+class ProfileSignalTests(TestCase):
+    """Profiles are created with the user and not re-saved with it."""
+
+    def test_profile_created_with_user(self):
+        seeker = Account.objects.create_user(
+            "seeker@example.com", "Job", "Seeker", "password", account_type=1
+        )
+        employer = Account.objects.create_user(
+            "employer@example.com", "Em", "Ployer", "password", account_type=2
+        )
+        self.assertTrue(JobSeeker.objects.filter(user=seeker).exists())
+        self.assertTrue(Employer.objects.filter(user=employer).exists())
+
+    def test_login_costs_one_write(self):
+        user = Account.objects.create_user(
+            "seeker@example.com", "Job", "Seeker", "password", account_type=1
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse("accounts:login"),
+                {"email": user.email, "password": "password"},
+            )
+        writes = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith(("INSERT", "UPDATE", "DELETE"))
+        ]
+        # the last_login update
+        self.assertEqual(len(writes), 1, writes)
+        self.assertRedirects(response, reverse("jobs:home"), target_status_code=302)
+
+
+class UIDTests(TestCase):
+    """UIDs are generated without queries and retried on collision."""
+
+    def test_uid_collision_is_retried(self):
+        first = Account.objects.create_user(
+            "first@example.com", "First", "User", "password"
+        )
+        with mock.patch(
+            "common.utils.generate_uid", side_effect=[first.uid, "newuid123456"]
+        ):
+            second = Account.objects.create_user(
+                "second@example.com", "Second", "User", "password"
+            )
+        self.assertEqual(second.uid, "newuid123456")
+
+    def test_other_integrity_errors_are_raised(self):
+        Account.objects.create_user("user@example.com", "First", "User", "password")
+        with self.assertRaises(IntegrityError):
+            Account.objects.create_user(
+                "user@example.com", "Second", "User", "password"
+            )
+
+
+@override_settings(
+    RATELIMITS={},
+    PASSWORD_HASHERS=[
+        "accounts.hashers.TunedScryptPasswordHasher",
+        "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    ],
+)
+class LoginHashingTests(TestCase):
+    """Passwords are checked in the hashing pool and upgraded on login."""
+
+    def setUp(self):
+        self.user = Account.objects.create_user(
+            "seeker@example.com", "Job", "Seeker", account_type=1
+        )
+        self.user.password = make_password("password", hasher="pbkdf2_sha256")
+        self.user.save(update_fields=["password"])
+
+    def login(self, password="password"):
+        return self.client.post(
+            reverse("accounts:login"),
+            {"email": self.user.email, "password": password},
+        )
+
+    def test_outdated_hash_is_upgraded_on_login(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 302)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("scrypt$"))
+        self.assertTrue(self.user.check_password("password"))
+
+    def test_wrong_password_keeps_hash(self):
+        response = self.login("wrong")
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+
+    def test_busy_pool_turns_logins_away(self):
+        with mock.patch("accounts.hashers.run_hashing", side_effect=LoginBusy):
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertNotIn("_auth_user_id", self.client.session)
+
+
+class BookmarkTests(JobTestCase):
+    """Job seekers toggle bookmarks one by one or sync a batch of changes."""
+
+    JOB_COUNT = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.seeker = Account.objects.create_user(
+            "seeker@example.com", "Job", "Seeker", "password", account_type=1
+        )
+
+    def setUp(self):
+        # rate limit buckets
+        cache.clear()
+        self.client.force_login(self.seeker)
+
+    def saved(self):
+        return set(
+            Bookmark.objects.filter(user=self.seeker).values_list("job", flat=True)
+        )
+
+    def toggle(self, job_id):
+        return self.client.post(reverse("accounts:bookmark"), {"job_id": job_id})
+
+    def sync(self, changes):
+        return self.client.post(
+            reverse("accounts:bookmark-sync"), changes, content_type="application/json"
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "data-modifying CTE")
+    def test_toggle(self):
+        job = self.jobs[0]
+        response = self.toggle(job.pk)
+        self.assertEqual(
+            response.json(), {"is_bookmarked": True, "job_id": str(job.pk)}
+        )
+        self.assertEqual(self.saved(), {job.pk})
+        response = self.toggle(job.pk)
+        self.assertEqual(response.json()["is_bookmarked"], False)
+        self.assertEqual(self.saved(), set())
+
+    def test_toggle_unknown_job(self):
+        self.assertEqual(self.toggle("job").status_code, 404)
+        self.assertEqual(self.saved(), set())
+
+    @skipUnless(connection.vendor == "postgresql", "SQLite checks foreign keys late")
+    def test_toggle_missing_job(self):
+        self.assertEqual(self.toggle(self.jobs[-1].pk + 1000).status_code, 404)
+        self.assertEqual(self.saved(), set())
+
+    def test_sync(self):
+        first, second, third = self.jobs
+        Bookmark.objects.create(user=self.seeker, job=first)
+        response = self.sync(
+            {"save": [second.pk, third.pk, third.pk + 1000], "unsave": [first.pk]}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()["saved"]), {second.pk, third.pk})
+        self.assertEqual(self.saved(), {second.pk, third.pk})
+        # already applied changes are no-ops
+        response = self.sync({"save": [second.pk], "unsave": [first.pk]})
+        self.assertEqual(set(response.json()["saved"]), {second.pk, third.pk})
+
+    def test_invalid_sync(self):
+        for changes in [[1, 2], {"save": ["job"]}, {"save": 1}, {"save": "12"}]:
+            self.assertEqual(self.sync(changes).status_code, 400)
+        too_many = {"save": list(range(MAX_BOOKMARK_CHANGES + 1))}
+        self.assertEqual(self.sync(too_many).status_code, 400)
+        response = self.client.post(
+            reverse("accounts:bookmark-sync"), "{", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.saved(), set())
+
+    def test_post_only_and_login_required(self):
+        self.assertEqual(self.client.get(reverse("accounts:bookmark")).status_code, 405)
+        self.client.logout()
+        self.assertEqual(self.toggle(self.jobs[0].pk).status_code, 401)
+        self.assertEqual(self.sync({"save": [self.jobs[0].pk]}).status_code, 401)
+        self.assertEqual(self.saved(), set())
+
+
+@override_settings(RATELIMITS={"signin": "2/m", "bookmark": "1/m"})
+class RateLimitTests(TestCase):
+    """Abuse-prone views are limited per client IP and per account."""
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, email="seeker@example.com", ip="10.0.0.1"):
+        return self.client.post(
+            reverse("accounts:login"),
+            {"email": email, "password": "wrong"},
+            REMOTE_ADDR=ip,
+        )
+
+    def test_limit_per_ip(self):
+        self.assertEqual(self.login("a@example.com").status_code, 200)
+        self.assertEqual(self.login("b@example.com").status_code, 200)
+        response = self.login("c@example.com")
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+        self.assertEqual(ratelimit.hit_count("signin"), 1)
+
+    def test_limit_per_account(self):
+        self.login(ip="10.0.0.1")
+        self.login(ip="10.0.0.2")
+        self.assertEqual(self.login(ip="10.0.0.3").status_code, 429)
+
+    def test_limited_requests_skip_the_database(self):
+        self.login()
+        self.login()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.login().status_code, 429)
+
+    def test_async_view(self):
+        url = reverse("accounts:bookmark")
+        self.assertEqual(self.client.post(url, {"job_id": 1}).status_code, 401)
+        self.assertEqual(self.client.post(url, {"job_id": 1}).status_code, 429)
+
+    def test_bucket_refills(self):
+        bucket = ratelimit.TokenBucket(cache, "bucket", capacity=2, period=60)
+        self.assertTrue(bucket.consume(now=0))
+        self.assertTrue(bucket.consume(now=0))
+        self.assertFalse(bucket.consume(now=1))
+        self.assertAlmostEqual(bucket.retry_after, 29)
+        self.assertTrue(bucket.consume(now=30))
@@ -11,7 +11,8 @@ urlpatterns = [
     path("login/", views.signin, name="login"),
     path("logout/", views.signout, name="logout"),
     path("verify/", views.inform_to_verify, name="verify"),
-    path("bookmark/", views.BookmarkJob.as_view(), name="bookmark"),
+    path("bookmark/", views.bookmark_job, name="bookmark"),
+    path("bookmark/sync/", views.sync_bookmarks, name="bookmark-sync"),
     path("confirm/<uidb64>/<token>/", views.activate, name="activate"),
     path("<str:uid>/", views.JobSeekerProfile.as_view(), name="js-profile"),
     path("<str:uid>/saved/", views.SavedJobs.as_view(), name="js-saved-jobs"),
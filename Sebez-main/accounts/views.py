@@ -1,25 +1,39 @@
+import json
+
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.sites.shortcuts import get_current_site
 from django.core.mail import EmailMessage
-from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
-from django.shortcuts import get_object_or_404, redirect, render
+from django.db import IntegrityError, connections, router, transaction
+from django.http import (
+    HttpResponse,
+    HttpResponseForbidden,
+    HttpResponseNotAllowed,
+    JsonResponse,
+)
+from django.shortcuts import redirect, render
 from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.encoding import force_bytes, force_str
 from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
-from django.views.generic import ListView, View
+from django.views.generic import ListView
 
+from common import cache, utils
+from common.ratelimit import ratelimit
 from jobs.models import JobApplication
 
 from .forms import LoginForm, SignupForm, UserUpdateForm, JSProfileUpdateForm
+from .hashers import LoginBusy
 from .models import Account, JobSeeker, Bookmark
 from .tokens import email_confirmation_token
-from jobs.models import Job
+from jobs.models import Job, exclude_reported
  
 
+@ratelimit("signin", keys=("ip", "post:email"))
 def signin(request):
     """Display login form and handle the login process."""
     if request.user.is_authenticated:
@@ -28,21 +42,29 @@ def signin(request):
         else:
             return redirect("jobs:home")
 
+    status = 200
     if request.method == "POST":
         email = request.POST["email"]
         password = request.POST["password"]
-        user = authenticate(request, email=email, password=password)
+        try:
+            user = authenticate(request, email=email, password=password)
+        except LoginBusy:
+            user = None
+            status = 503
+            messages.error(
+                request, "Too many people are logging in. Please try again shortly."
+            )
         if user is not None:
             login(request, user)
             if user.account_type == 2:
                 return redirect("jobs:employer-home")
             else:
                 return redirect("jobs:home")
-        else:
+        elif status == 200:
             messages.error(request, "Invalid Email or Password.")
     login_form = LoginForm()
     context = {"login_form": login_form}
-    return render(request, "accounts/login.html", context)
+    return render(request, "accounts/login.html", context, status=status)
 
 
 def signout(request):
@@ -51,6 +73,7 @@ def signout(request):
     return redirect("jobs:home")
 
 
+@ratelimit("signup")
 def signup(request):
     """Display signup form and handle the signup action."""
 
@@ -103,7 +126,7 @@ def activate(request, uidb64, token):
 
     if user is not None and email_confirmation_token.check_token(user, token):
         user.is_active = True
-        user.save()
+        user.save(update_fields=["is_active"])
         # Automatically log the user in up on successful confirmation
         login(request, user)
         messages.success(request, "Your email has been verified successfully.")
@@ -141,8 +164,7 @@ class JobSeekerProfile(LoginRequiredMixin, UserPassesTestMixin, ListView):
 
     def test_func(self):
         # check the user trying to view profile is the owner
-        user = get_object_or_404(Account, uid=self.kwargs.get("uid"))
-        return self.request.user == user
+        return self.request.user.uid == self.kwargs.get("uid")
 
 
 class SavedJobs(LoginRequiredMixin, ListView):
@@ -153,32 +175,26 @@ class SavedJobs(LoginRequiredMixin, ListView):
     template_name = "accounts/saved_jobs.html"
     paginate_by = 10
 
+    def get_queryset(self):
+        saved_jobs = (
+            Job.objects.filter(bookmark__user=self.request.user)
+            .select_related("employer")
+            .defer("description")
+            .order_by("-bookmark__saved_at")
+        )
+        return exclude_reported(saved_jobs, self.request.user)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        saved_jobs = []
-        reported_jobs = []
-        if self.request.user.pk is not None:
-            user = Account.objects.get(id=self.request.user.pk)
-            jobseeker = JobSeeker.objects.get(user=user)
-            saved_jobs = [b.job for b in user.bookmark_set.all()]
-            reported_jobs = [r.job for r in jobseeker.reports.all()]
-
-        context["saved_jobs"] = saved_jobs
-        context["reported_jobs"] = reported_jobs
+        context["saved_job_ids"] = {job.pk for job in context["saved_jobs"]}
         return context
 
-    def get_queryset(self):
-        user = Account.objects.get(id=self.request.user.pk)
-        saved_jobs = [b.job for b in user.bookmark_set.all()]
-        return saved_jobs
-
 
 @login_required
 def update_profile(request, uid):
     """Update job seeker profile for authenticated user."""
     # Check if the user is authorized to edit the profile.
-    owner = Account.objects.get(uid=uid)
-    if request.user == owner:
+    if request.user.uid == uid:
         # can edit its own profile
         if request.method == "POST":
             user_form = UserUpdateForm(request.POST, instance=request.user)
@@ -186,8 +202,8 @@ def update_profile(request, uid):
                 request.POST, request.FILES, instance=request.user.jobseeker
             )
             if user_form.is_valid() and profile_form.is_valid():
-                user_form.save()
-                profile_form.save()
+                utils.save_changed_fields(user_form)
+                utils.save_changed_fields(profile_form)
                 messages.success(request, "Your account has been updated successfully.")
                 return redirect(to=reverse("accounts:js-profile", args=(uid,)))
         else:
@@ -221,44 +237,156 @@ class SubmittedProposals(LoginRequiredMixin, UserPassesTestMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        jobseeker = JobSeeker.objects.get(user=self.request.user)
-        active = JobApplication.objects.filter(jobseeker=jobseeker, status__lt=3)
-        archived = JobApplication.objects.filter(jobseeker=jobseeker, status=3)
+        applications = (
+            JobApplication.objects.filter(jobseeker=self.request.user.jobseeker)
+            .select_related("job__employer")
+            .defer("job__description")
+        )
+        active = applications.filter(status__lt=3)
+        archived = applications.filter(status=3)
         context["active"] = active
         context["archived"] = archived
         return context
 
     def test_func(self):
         # check the user trying to view profile is the owner
-        user = get_object_or_404(Account, uid=self.kwargs.get("uid"))
-        return self.request.user == user
+        return self.request.user.uid == self.kwargs.get("uid")
+
+
+# most bookmark changes accepted in a single sync request
+MAX_BOOKMARK_CHANGES = 500
+
+# deletes the bookmark, or inserts it if there was none to delete and the
+# job exists, and returns whether it deleted one and whether the job exists
+TOGGLE_BOOKMARK_SQL = """
+    WITH deleted AS (
+        DELETE FROM {bookmark}
+        WHERE user_id = %(user_id)s AND job_id = %(job_id)s
+        RETURNING 1
+    ), inserted AS (
+        INSERT INTO {bookmark} (user_id, job_id, saved_at)
+        SELECT %(user_id)s, id, %(saved_at)s FROM {job}
+        WHERE id = %(job_id)s AND NOT EXISTS (SELECT 1 FROM deleted)
+        ON CONFLICT DO NOTHING
+        RETURNING 1
+    )
+    SELECT
+        EXISTS (SELECT 1 FROM deleted),
+        EXISTS (SELECT 1 FROM {job} WHERE id = %(job_id)s)
+"""
+
+
+@sync_to_async
+def toggle_bookmark(user, job_id):
+    """
+    Save the job for the user, or unsave it if it is already saved.
+    Return whether the job is saved now, or None if there is no such job.
+
+    The toggle is a single statement and never loads the job, and a
+    concurrent toggle (e.g. a double click) inserting the same bookmark
+    is ignored instead of failing on the unique_bookmark constraint.
+    """
+    try:
+        job_id = int(job_id)
+    except (TypeError, ValueError):
+        return None
+    connection = connections[router.db_for_write(Bookmark)]
+    sql = TOGGLE_BOOKMARK_SQL.format(
+        bookmark=connection.ops.quote_name(Bookmark._meta.db_table),
+        job=connection.ops.quote_name(Job._meta.db_table),
+    )
+    params = {"user_id": user.pk, "job_id": job_id, "saved_at": timezone.now()}
+    try:
+        # a savepoint, so a failed toggle doesn't break an outer transaction
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                deleted, job_exists = cursor.fetchone()
+    except IntegrityError:
+        # the job was deleted meanwhile (foreign key violation)
+        return None
+    if not deleted and not job_exists:
+        return None
+    cache.bump("user", user.pk)
+    # a bookmark inserted meanwhile by a concurrent toggle is saved too
+    return not deleted
+
+
+@sync_to_async
+def apply_bookmark_changes(user, save_ids, unsave_ids):
+    """
+    Unsave and save the given jobs for the user in one transaction and
+    return the ids of all the jobs the user has saved.
+    """
+    with transaction.atomic():
+        Bookmark.objects.filter(user=user, job_id__in=unsave_ids).delete()
+        existing_jobs = Job.objects.filter(pk__in=save_ids).values_list("pk", flat=True)
+        Bookmark.objects.bulk_create(
+            [Bookmark(user=user, job_id=job_id) for job_id in existing_jobs],
+            ignore_conflicts=True,
+        )
+    cache.bump("user", user.pk)
+    return list(Bookmark.objects.filter(user=user).values_list("job_id", flat=True))
 
 
-class BookmarkJob(View):
+@ratelimit("bookmark", keys=("ip", "user"))
+async def bookmark_job(request):
     """Handle bookmarking job using ajax calls."""
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    user = await utils.aget_user(request)
+    if user.is_authenticated:
+        # bookmark selected job
+        job_id = request.POST.get("job_id")
+        is_bookmarked = await toggle_bookmark(user, job_id)
+        if is_bookmarked is None:
+            return JsonResponse({"is_bookmarked": False, "job_id": job_id}, status=404)
+        return JsonResponse(
+            {"is_bookmarked": is_bookmarked, "job_id": job_id}, status=200
+        )
+    else:
+        # Not authenticated
+        messages.warning(
+            request,
+            "Login to your account to bookmark jobs.",
+        )
+        return JsonResponse({"is_bookmarked": False}, status=401)
 
-    def post(self, request):
-        user = self.request.user
-        if user.is_authenticated:
-            # bookmark selected job
-            job_id = request.POST.get("job_id")
-            selected_job = Job.objects.get(pk=job_id)
-            is_bookmarked = False  # initial assumption
-            bookmark = Bookmark.objects.filter(user=user, job=selected_job).first()
-            if bookmark:
-                # The user has already saved it, unsave now
-                bookmark.delete()
-            else:
-                # save the bookmark now
-                Bookmark.objects.create(user=user, job=selected_job)
-                is_bookmarked = True
-            return JsonResponse(
-                {"is_bookmarked": is_bookmarked, "job_id": job_id}, status=200
-            )
-        else:
-            # Not authenticated
-            messages.warning(
-                self.request,
-                "Login to your account to bookmark jobs.",
-            )
-            return JsonResponse({"is_bookmarked": False}, status=401)
+
+@ratelimit("bookmark", keys=("ip", "user"))
+async def sync_bookmarks(request):
+    """
+    Apply bookmark changes made by offline clients at once.
+
+    Expects a JSON body {"save": [job ids], "unsave": [job ids]} and
+    responds with the ids of all the jobs saved by the user.
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    user = await utils.aget_user(request)
+    if not user.is_authenticated:
+        return JsonResponse(
+            {"error": "Login to your account to bookmark jobs."}, status=401
+        )
+
+    try:
+        changes = json.loads(request.body)
+        save_ids = changes.get("save", [])
+        unsave_ids = changes.get("unsave", [])
+        # a string would be read as a list of digits
+        if not isinstance(save_ids, list) or not isinstance(unsave_ids, list):
+            raise ValueError
+        save_ids = [int(job_id) for job_id in save_ids]
+        unsave_ids = [int(job_id) for job_id in unsave_ids]
+    except (AttributeError, TypeError, ValueError):
+        return JsonResponse({"error": "Invalid bookmark changes."}, status=400)
+    if len(save_ids) + len(unsave_ids) > MAX_BOOKMARK_CHANGES:
+        return JsonResponse(
+            {"error": f"At most {MAX_BOOKMARK_CHANGES} changes are accepted."},
+            status=400,
+        )
+
+    saved = await apply_bookmark_changes(user, save_ids, unsave_ids)
+    return JsonResponse({"saved": saved}, status=200)
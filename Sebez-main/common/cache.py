@@ -0,0 +1,155 @@
+"""
+Versioned cache keys, shared by all the workers through a shared cache.
+
+Every cached entity (a job, a category, an employer, or the interactions
+of a user) has a version counter in the cache, and so has every
+namespace. Keys of cached values include the versions of the entities
+they were computed from, so bumping a version makes all the values
+depending on the entity unreachable, in every worker at once, and
+bumping a namespace does it for all of its entities with a single
+write instead of a scan of the keys. Unreachable values are evicted or
+expire on their own.
+
+Versions are bumped by model signals (see jobs.models and
+accounts.models) or by the code changing data without them, e.g. with
+queryset.update(). Hits and misses of every kind of cached value are
+counted for metrics.
+
+Counters are read and written without a lock: a value computed while its
+entity changes may be stored under the old version, where it is never
+read again.
+
+Versions only work when every worker reads the same cache. A local memory
+or file cache is per process or per machine, and a bump there doesn't
+reach the other workers, so callers check is_shared() and otherwise key
+their values by data read from the database, or don't cache them.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.memcached import BaseMemcachedCache
+from django.core.cache.backends.redis import RedisCache
+
+NAMESPACES = ("job", "category", "employer", "user")
+
+# backends every worker of every machine reads the same data from
+SHARED_BACKENDS = (BaseMemcachedCache, DatabaseCache, RedisCache)
+
+
+def get_cache():
+    return caches[getattr(settings, "VERSIONED_CACHE", "default")]
+
+
+def is_shared():
+    """Return whether a bump is seen by all the workers."""
+    return isinstance(get_cache(), SHARED_BACKENDS)
+
+
+def version_key(namespace, pk=None):
+    if namespace not in NAMESPACES:
+        raise ValueError(f"Unknown cache namespace {namespace}.")
+    return f"version:{namespace}:{'*' if pk is None else pk}"
+
+
+def initial_version():
+    # from the clock, so a counter evicted from the cache doesn't start
+    # again from a version whose values may still be cached
+    return time.time_ns() // 1000
+
+
+def get_versions(entities):
+    """
+    Return {(namespace, pk): version} of the (namespace, pk) entities and
+    of their namespaces, as (namespace, None), read in one get_many().
+    """
+    entities = set(entities)
+    entities |= {(namespace, None) for namespace, _ in entities}
+    keys = {version_key(*entity): entity for entity in entities}
+    cache = get_cache()
+    found = cache.get_many(keys)
+    versions = {}
+    for key, entity in keys.items():
+        version = found.get(key)
+        if version is None:
+            version = initial_version()
+            if not cache.add(key, version, timeout=None):
+                # set by another worker meanwhile
+                version = cache.get(key, version)
+        versions[entity] = version
+    return versions
+
+
+def make_key(name, entities, versions=None):
+    """
+    Return the key of the name's value computed from the (namespace, pk)
+    entities. Pass the versions of get_versions() to build many keys with
+    one read.
+    """
+    if versions is None:
+        versions = get_versions(entities)
+    parts = [
+        f"{namespace}.{pk}.{versions[namespace, None]}.{versions[namespace, pk]}"
+        for namespace, pk in entities
+    ]
+    return ":".join([name, *parts])
+
+
+def bump(namespace, *pks):
+    """Invalidate the values of the entities, or of the whole namespace."""
+    cache = get_cache()
+    keys = [version_key(namespace, pk) for pk in pks] or [version_key(namespace)]
+    for key in keys:
+        if cache.add(key, initial_version(), timeout=None):
+            continue
+        try:
+            cache.incr(key)
+        except ValueError:
+            # evicted between add() and incr()
+            cache.set(key, initial_version(), timeout=None)
+
+
+def count(name, outcome, delta=1):
+    """Count hits or misses (the outcome) of the name's cached values."""
+    if not delta:
+        return
+    cache = get_cache()
+    key = f"cache:{outcome}:{name}"
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, timeout=None)
+
+
+def stats(name):
+    """Return the numbers of hits and misses of the name's cached values."""
+    keys = {f"cache:{outcome}:{name}": outcome for outcome in ("hits", "misses")}
+    found = get_cache().get_many(keys)
+    return {outcome: found.get(key, 0) for key, outcome in keys.items()}
+
+
+def get_many(name, keys):
+    """Return the cached values of the name's keys, counting hits and misses."""
+    found = get_cache().get_many(keys)
+    count(name, "hits", len(found))
+    count(name, "misses", len(keys) - len(found))
+    return found
+
+
+def get_or_set(name, key, compute, timeout):
+    """
+    Return the cached value of the name's key, or compute, cache and
+    return it, counting hits and misses.
+    """
+    cache = get_cache()
+    value = cache.get(key)
+    if value is not None:
+        count(name, "hits")
+        return value
+    count(name, "misses")
+    value = compute()
+    cache.set(key, value, timeout)
+    return value
@@ -0,0 +1,172 @@
+"""
+Rate limiting of views with token buckets kept in the Django cache.
+
+Every limited view has a scope whose rate ("10/m": 10 requests a minute,
+with bursts of up to 10) is read from settings.RATELIMITS. A request
+takes a token from one bucket per key (client IP, logged in account or a
+POSTed field); when any bucket is empty it is answered with 429 before
+the view, and thus the database, is reached.
+
+Buckets are read and written without a lock, so concurrent requests may
+occasionally take the same token: the limits are meant to shed abusive
+traffic, not to be exact.
+"""
+
+import asyncio
+import logging
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """Return (requests, seconds) of a rate such as "10/m"."""
+    requests, period = rate.split("/")
+    return int(requests), PERIODS[period]
+
+
+def get_cache():
+    return caches[getattr(settings, "RATELIMIT_CACHE", "default")]
+
+
+class TokenBucket:
+    """
+    A bucket holding up to capacity tokens, refilled at capacity tokens
+    per period seconds.
+    """
+
+    def __init__(self, cache, key, capacity, period):
+        self.cache = cache
+        self.key = key
+        self.capacity = capacity
+        self.period = period
+        self.retry_after = 0
+
+    def consume(self, now=None):
+        """Take a token and return True, or return False if there is none."""
+        now = time.time() if now is None else now
+        tokens, updated = self.cache.get(self.key, (self.capacity, now))
+        refill = (now - updated) * self.capacity / self.period
+        tokens = min(self.capacity, tokens + refill)
+        if tokens < 1:
+            self.retry_after = (1 - tokens) * self.period / self.capacity
+            return False
+        # a bucket left alone for a period is full again, so it can expire
+        self.cache.set(self.key, (tokens - 1, now), timeout=self.period)
+        return True
+
+
+def client_ip(request):
+    """
+    Return the IP address of the client. Behind a proxy, RATELIMIT_IP_HEADER
+    names the header holding the addresses it forwarded for; the last
+    one is the address the proxy saw.
+    """
+    header = getattr(settings, "RATELIMIT_IP_HEADER", None)
+    if header and request.META.get(header):
+        return request.META[header].split(",")[-1].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def request_keys(request, keys):
+    """Return the bucket keys of the request, skipping the missing ones."""
+    result = []
+    for key in keys:
+        if key == "ip":
+            value = client_ip(request)
+        elif key == "user":
+            # from the session, so the user isn't loaded from the database
+            value = request.session.get("_auth_user_id")
+        elif key.startswith("post:"):
+            value = request.POST.get(key[len("post:") :], "").strip().lower()
+        else:
+            raise ValueError(f"Unknown rate limit key {key}.")
+        if value:
+            result.append(f"{key}:{value}")
+    return result
+
+
+def count_hit(scope):
+    """Count a request turned away in the scope, for metrics."""
+    cache = get_cache()
+    key = f"ratelimit:hits:{scope}"
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # evicted between add() and incr()
+        cache.set(key, 1, timeout=None)
+
+
+def hit_count(scope):
+    """Return the number of requests turned away in the scope so far."""
+    return get_cache().get(f"ratelimit:hits:{scope}", 0)
+
+
+def check_limits(request, scope, keys, methods):
+    """Return a 429 response if the request exceeds a limit of the scope."""
+    if request.method not in methods:
+        return None
+    rate = getattr(settings, "RATELIMITS", {}).get(scope)
+    if not rate:
+        return None
+
+    capacity, period = parse_rate(rate)
+    cache = get_cache()
+    for key in request_keys(request, keys):
+        bucket = TokenBucket(cache, f"ratelimit:{scope}:{key}", capacity, period)
+        if not bucket.consume():
+            count_hit(scope)
+            logger.warning("Rate limit of %s exceeded by %s", scope, key)
+            response = HttpResponse(
+                "Too many requests. Please try again later.", status=429
+            )
+            response["Retry-After"] = str(int(bucket.retry_after) + 1)
+            return response
+    return None
+
+
+def ratelimit(scope, keys=("ip",), methods=("POST",)):
+    """
+    Limit the requests made to a view with the given methods to the rate
+    of the scope in settings.RATELIMITS, per key:
+
+    - "ip": the client IP address
+    - "user": the logged in account
+    - "post:<field>": the value of a POSTed field, e.g. "post:email"
+
+    Works with both sync and async views.
+    """
+
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                limited = await sync_to_async(check_limits)(
+                    request, scope, keys, methods
+                )
+                if limited is not None:
+                    return limited
+                return await view(request, *args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            limited = check_limits(request, scope, keys, methods)
+            if limited is not None:
+                return limited
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,29 @@
+"""Static files storage building the asset bundles during collectstatic."""
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+from . import assets
+
+
+class BundlingStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    Write the ASSET_BUNDLES into STATIC_ROOT from the collected sources
+    before the files are fingerprinted and compressed.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for name, sources in settings.ASSET_BUNDLES.items():
+                path = assets.bundle_path(name)
+                texts = []
+                for source in sources:
+                    with self.open(source) as file:
+                        texts.append((source, file.read().decode()))
+                if self.exists(path):
+                    self.delete(path)
+                bundle = assets.build_bundle(name, texts)
+                self.save(path, ContentFile(bundle.encode()))
+                paths[path] = (self, path)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
@@ -1,7 +1,14 @@
 """Helper functions used across all apps."""
 
+from html import unescape
+
+from asgiref.sync import sync_to_async
 from django.utils.crypto import get_random_string
-from django.utils.text import slugify
+from django.utils.html import strip_tags
+from django.utils.text import Truncator, slugify
+
+SUMMARY_LENGTH = 200
+UID_LENGTH = 12
 
 
 def generate_slug(Klass, base_word):
@@ -20,16 +27,50 @@ def generate_slug(Klass, base_word):
         return unique_slug
 
 
-def generate_uid(Klass):
-    """Generate 12 character random string that is unique in the Klass."""
-    uid = get_random_string(length=12)
-    is_taken = Klass.objects.filter(uid=uid).exists()
+def generate_uid():
+    """
+    Generate a random 12 character UID.
 
-    while is_taken:
-        uid = get_random_string(length=12)
-        is_taken = Klass.objects.filter(uid=uid).exists()
-    else:
-        return uid
+    62 ** 12 possible values make collisions very unlikely, so nothing is
+    queried here: the unique constraint on the uid column catches the
+    rare collision and Account.save retries with a new UID.
+    """
+    return get_random_string(length=UID_LENGTH)
+
+
+def generate_summary(text, length=SUMMARY_LENGTH):
+    """
+    Return a plain text summary of the given (possibly HTML) text that
+    is at most length characters long.
+    """
+    if not text:
+        return ""
+    # pad tags with a space so words of adjacent blocks are not glued together
+    plain_text = strip_tags(text.replace("<", " <"))
+    plain_text = " ".join(unescape(plain_text).split())
+    return Truncator(plain_text).chars(length)
+
+
+async def aget_user(request):
+    """
+    Return request.user for async views. The user is loaded lazily from the
+    session (a database query), so it is resolved in a worker thread.
+    """
+    await sync_to_async(lambda: request.user.is_authenticated)()
+    return request.user
+
+
+def save_changed_fields(form):
+    """
+    Save the instance of a valid ModelForm, writing only the fields
+    changed by the form. Return the instance.
+    """
+    instance = form.save(commit=False)
+    if instance.pk is None:
+        instance.save()
+    elif form.has_changed():
+        instance.save(update_fields=form.changed_data)
+    return instance
 
 
 def validate_resume_file_extension(value):
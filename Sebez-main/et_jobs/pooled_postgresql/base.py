@@ -0,0 +1,190 @@
+"""
+PostgreSQL backend keeping a pool of open connections per worker process.
+
+Use it with CONN_MAX_AGE = 0: Django then "closes" the connection at the
+end of every request, which returns it to the pool instead. Pool options
+go in the POOL key of the database settings:
+
+    "POOL": {
+        "MAX_SIZE": 4,  # connections per worker process
+        "TIMEOUT": 10,  # seconds to wait for a free connection
+        "HEALTH_CHECK_INTERVAL": 30,  # ping connections idle for longer
+    }
+
+A connection idle for more than HEALTH_CHECK_INTERVAL seconds is checked
+with a cheap query before it is handed out again, so connections dropped
+by the server (or by an SSL terminating proxy) are replaced instead of
+failing the request.
+"""
+
+import logging
+import threading
+import time
+
+import psycopg2
+from psycopg2 import extensions
+from django.db.backends.postgresql import base
+from django.db.utils import OperationalError
+
+logger = logging.getLogger(__name__)
+
+# a checkout waiting longer than this (seconds) is logged
+SLOW_CHECKOUT = 0.1
+# pool statistics are logged every STATS_INTERVAL checkouts
+STATS_INTERVAL = 1000
+
+
+class ConnectionPool:
+    """A bounded, thread safe pool of psycopg2 connections."""
+
+    def __init__(self, alias, max_size=4, timeout=10, health_check_interval=30):
+        self.alias = alias
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle = []  # (connection, time it was returned)
+        # guards _idle and stats, which every thread of the worker updates
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self.stats = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "created": 0,
+            "discarded": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+        }
+
+    def checkout(self, connect):
+        """
+        Return an idle healthy connection, or a new one made by connect().
+        Wait up to timeout seconds when max_size connections are in use.
+        """
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            self._count("timeouts")
+            raise OperationalError(
+                f"No connection of the {self.alias!r} pool became free in "
+                f"{self.timeout} seconds (pool size {self.max_size})."
+            )
+        self._record_wait(time.monotonic() - start)
+
+        try:
+            while True:
+                with self._lock:
+                    item = self._idle.pop() if self._idle else None
+                if item is None:
+                    self._count("created")
+                    return connect()
+                connection, returned_at = item
+                if self._is_usable(connection, returned_at):
+                    return connection
+                self._discard(connection)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def checkin(self, connection):
+        """Give a connection back to the pool."""
+        try:
+            if connection.closed:
+                self._count("discarded")
+                return
+            status = connection.get_transaction_status()
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                self._discard(connection)
+                return
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            with self._lock:
+                self._idle.append((connection, time.monotonic()))
+        except psycopg2.Error:
+            self._discard(connection)
+        finally:
+            self._slots.release()
+
+    def _is_usable(self, connection, returned_at):
+        if connection.closed:
+            return False
+        if time.monotonic() - returned_at < self.health_check_interval:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _discard(self, connection):
+        self._count("discarded")
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+    def _record_wait(self, waited):
+        with self._lock:
+            stats = self.stats
+            stats["checkouts"] += 1
+            stats["wait_total"] += waited
+            stats["wait_max"] = max(stats["wait_max"], waited)
+            checkouts = stats["checkouts"]
+        if waited > SLOW_CHECKOUT:
+            logger.warning(
+                "Waited %.3fs for a connection of the %r pool.", waited, self.alias
+            )
+        if checkouts % STATS_INTERVAL == 0:
+            logger.info("Connection pool %r: %s", self.alias, self.get_stats())
+
+    def get_stats(self):
+        """Return the pool statistics including the mean checkout wait."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["idle"] = len(self._idle)
+        stats["wait_mean"] = stats["wait_total"] / (stats["checkouts"] or 1)
+        return stats
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    """Return the connection pool of a database alias (one per process)."""
+    with _pools_lock:
+        if alias not in _pools:
+            options = settings_dict.get("POOL", {})
+            _pools[alias] = ConnectionPool(
+                alias,
+                max_size=options.get("MAX_SIZE", 4),
+                timeout=options.get("TIMEOUT", 10),
+                health_check_interval=options.get("HEALTH_CHECK_INTERVAL", 30),
+            )
+        return _pools[alias]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL connections taken from and returned to a ConnectionPool."""
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.checkout(
+            lambda: super(DatabaseWrapper, self).get_new_connection(conn_params)
+        )
+        options = self.settings_dict["OPTIONS"]
+        self.isolation_level = options.get(
+            "isolation_level", connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.checkin(self.connection)
@@ -0,0 +1,115 @@
+"""
+Database routing that sends the reads of read-heavy views to replicas.
+
+Views opt in with `use_read_replica = True`. ReplicaRoutingMiddleware
+decides per request whether reads may go to a replica; everything else
+(writes, migrations, views that did not opt in) uses the primary.
+"""
+
+import asyncio
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# cookie holding the time until which the client must read from the primary
+PIN_COOKIE = "primary_pin"
+
+_routing = ContextVar("replica_routing", default=None)
+
+
+class RequestRouting:
+    """Routing state of the request being handled."""
+
+    def __init__(self, use_replica=False):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+class ReplicaRouter:
+    """Route reads to a configured replica when the current request allows it."""
+
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        replicas = getattr(settings, "DATABASE_REPLICAS", [])
+        if routing is not None and routing.use_replica and replicas:
+            return random.choice(replicas)
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Allow replica reads for views marked with `use_read_replica`, unless
+    the client wrote to the database in the last REPLICA_PIN_SECONDS
+    (read-your-writes: replicas may lag behind the primary).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            # Mark the middleware as async, like django's MiddlewareMixin
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        routing = RequestRouting()
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin_if_wrote(routing, response)
+
+    async def __acall__(self, request):
+        routing = RequestRouting()
+        token = _routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin_if_wrote(routing, response)
+
+    def pin_if_wrote(self, routing, response):
+        if routing.wrote:
+            pin_seconds = getattr(settings, "REPLICA_PIN_SECONDS", 5)
+            response.set_cookie(
+                PIN_COOKIE,
+                str(time.time() + pin_seconds),
+                max_age=pin_seconds,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "view_class", view_func)
+        if (
+            getattr(view_class, "use_read_replica", False)
+            and request.method in ("GET", "HEAD")
+            and not self.is_pinned(request)
+        ):
+            _routing.get().use_replica = True
+
+    def is_pinned(self, request):
+        try:
+            return float(request.COOKIES[PIN_COOKIE]) > time.time()
+        except (KeyError, ValueError):
+            return False
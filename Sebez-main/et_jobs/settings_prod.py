@@ -57,6 +57,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "et_jobs.routers.ReplicaRoutingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -69,8 +70,17 @@ TEMPLATES = [
         "DIRS": [
             os.path.join(BASE_DIR, "templates"),
         ],
-        "APP_DIRS": True,
         "OPTIONS": {
+            # templates are parsed once per process, whatever DEBUG says
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -95,6 +105,95 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# "locmem" (per process, the default), "file" (shared by the processes of
+# one machine) or "redis" (shared by all machines, needs REDIS_URL)
+
+CACHE_BACKEND = os.environ.get(
+    "CACHE_BACKEND", "redis" if os.environ.get("REDIS_URL") else "locmem"
+)
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+elif CACHE_BACKEND == "file":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get("CACHE_LOCATION", BASE_DIR / ".cache"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Sessions and messages are kept out of the database: sessions live in the
+# cache ("cache"), in a signed cookie ("signed_cookies") or, as before, in
+# the database ("db" or "cached_db"). A local memory cache is not shared by
+# the gunicorn workers, so sessions go to signed cookies without redis.
+SESSION_BACKEND = os.environ.get(
+    "SESSION_BACKEND", "cache" if CACHE_BACKEND == "redis" else "signed_cookies"
+)
+SESSION_ENGINE = {
+    "cache": "django.contrib.sessions.backends.cache",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "db": "django.contrib.sessions.backends.db",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}[SESSION_BACKEND]
+
+MESSAGE_STORAGE = "django.contrib.messages.storage.cookie.CookieStorage"
+
+# Weighted report score (see jobs.models.Report.REASON_WEIGHTS) at which a
+# job is hidden from listings until a moderator restores it
+REPORT_HIDE_THRESHOLD = int(os.environ.get("REPORT_HIDE_THRESHOLD", 5))
+
+# Rate limits of abuse-prone actions ("requests/s|m|h|d" per client IP and
+# account), kept in this cache
+RATELIMIT_CACHE = "default"
+RATELIMITS = {
+    "signin": "10/m",
+    "signup": "5/h",
+    "report": "10/h",
+    "bookmark": "60/m",
+}
+# META header with the client IPs forwarded by the proxy, if any
+RATELIMIT_IP_HEADER = os.environ.get("RATELIMIT_IP_HEADER", "HTTP_X_FORWARDED_FOR")
+
+# Password hashing
+# PASSWORD_HASHER (scrypt, argon2 or pbkdf2) hashes new passwords; the
+# other hashers still verify old hashes, which are upgraded on login.
+# argon2 needs the argon2-cffi package.
+PASSWORD_HASHER = os.environ.get("PASSWORD_HASHER", "scrypt")
+PASSWORD_HASHER_CLASSES = {
+    "scrypt": "accounts.hashers.TunedScryptPasswordHasher",
+    "argon2": "accounts.hashers.TunedArgon2PasswordHasher",
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHERS = [PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]] + [
+    hasher
+    for name, hasher in PASSWORD_HASHER_CLASSES.items()
+    if name != PASSWORD_HASHER
+]
+PASSWORD_HASHERS.append("django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher")
+
+# cost of a hash: ~16 MiB and ~50 ms per scrypt hash with the defaults
+SCRYPT_WORK_FACTOR = int(os.environ.get("SCRYPT_WORK_FACTOR", 2**14))
+SCRYPT_BLOCK_SIZE = int(os.environ.get("SCRYPT_BLOCK_SIZE", 8))
+ARGON2_TIME_COST = int(os.environ.get("ARGON2_TIME_COST", 2))
+ARGON2_MEMORY_COST = int(os.environ.get("ARGON2_MEMORY_COST", 65536))
+ARGON2_PARALLELISM = int(os.environ.get("ARGON2_PARALLELISM", 1))
+
+# threads hashing passwords per process, and logins allowed to wait for them
+LOGIN_HASH_THREADS = int(os.environ.get("LOGIN_HASH_THREADS", 2))
+LOGIN_HASH_QUEUE_SIZE = int(os.environ.get("LOGIN_HASH_QUEUE_SIZE", 8))
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -139,11 +238,27 @@ STATICFILES_DIRS = [
 
 # Simplified static file serving.
 # https://warehouse.python.org/project/whitenoise/
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+# collectstatic builds the bundles, then fingerprints every file and writes
+# its gzip and brotli variants. WhiteNoise serves the fingerprinted files
+# with a ten year "immutable" Cache-Control.
+STATICFILES_STORAGE = "common.storage.BundlingStaticFilesStorage"
+
+# CSS and JS bundles loaded by the templates with {% asset_bundle %}, see
+# common.assets
+ASSET_BUNDLES = {
+    "site.css": ["css/base-style.css"],
+    "employer.css": ["css/base-style.css", "css/main.css"],
+    "site.js": ["js/alert-removal.js"],
+    "jobs.js": ["accounts/js/app.js", "js/alert-removal.js"],
+}
+ASSETS_BUNDLED = True
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Address of the site used in the sitemaps
+SITE_URL = os.environ.get("SITE_URL", "https://sebez.com")
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -151,6 +266,9 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "accounts.Account"
 
+# loads the profile of the logged in user along with the user
+AUTHENTICATION_BACKENDS = ["accounts.backends.ProfileBackend"]
+
 # Login and Logout
 LOGOUT_REDIRECT_URL = "jobs:home"
 LOGIN_REDIRECT_URL = "jobs:home"
@@ -178,3 +296,37 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 import dj_database_url
 
 DATABASES["default"] = dj_database_url.config(conn_max_age=600, ssl_require=True)
+
+# Read replicas of the primary database (comma separated database urls)
+# used by read-heavy views, see et_jobs.routers
+DATABASE_REPLICAS = []
+for index, url in enumerate(
+    filter(None, os.environ.get("DATABASE_REPLICA_URLS", "").split(","))
+):
+    alias = f"replica{index + 1}"
+    DATABASES[alias] = dj_database_url.parse(
+        url.strip(), conn_max_age=600, ssl_require=True
+    )
+    DATABASES[alias]["TEST"] = {"MIRROR": "default"}
+    DATABASE_REPLICAS.append(alias)
+
+# Pooled connections: each worker process keeps up to DB_POOL_SIZE open
+# connections per database, see et_jobs.pooled_postgresql and
+# gunicorn.conf.py for sizing.
+if os.environ.get("DB_POOL_SIZE"):
+    for database in DATABASES.values():
+        database["ENGINE"] = "et_jobs.pooled_postgresql"
+        # connections go back to the pool at the end of each request
+        database["CONN_MAX_AGE"] = 0
+        database["POOL"] = {
+            "MAX_SIZE": int(os.environ["DB_POOL_SIZE"]),
+            "TIMEOUT": float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+            "HEALTH_CHECK_INTERVAL": float(
+                os.environ.get("DB_POOL_HEALTH_CHECK_INTERVAL", 30)
+            ),
+        }
+
+DATABASE_ROUTERS = ["et_jobs.routers.ReplicaRouter"]
+
+# Seconds a client keeps reading from the primary after it wrote something
+REPLICA_PIN_SECONDS = 5
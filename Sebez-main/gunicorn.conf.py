@@ -0,0 +1,49 @@
+"""
+Gunicorn settings for the web dyno.
+
+The ASGI application is served by uvicorn workers, so the async AJAX views
+(bookmarks, applicant lists) run on each worker's event loop, and sync
+views run in threads of their own. GUNICORN_SERVER=wsgi serves the WSGI
+application with threaded workers instead, GUNICORN_THREADS requests at
+once per worker.
+
+Every worker process keeps its own pool of database connections, so the
+number of connections the app can open is
+
+    dynos * WEB_CONCURRENCY * DB_POOL_SIZE   (per database)
+
+which must stay below the max_connections of the Postgres plan (leave a
+few for migrations, shells and the scheduler). Requests of a worker
+beyond DB_POOL_SIZE that need the database wait for a connection; the
+wait shows up in the "Waited ... for a connection" warnings and the pool
+statistics logged by et_jobs.pooled_postgresql. With WSGI workers, a
+DB_POOL_SIZE equal to GUNICORN_THREADS never waits.
+
+Example profile for a 512MB dyno and a 20 connection Postgres plan:
+
+    WEB_CONCURRENCY=2 GUNICORN_THREADS=4 DB_POOL_SIZE=4   -> 8 connections
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Heroku sets WEB_CONCURRENCY from the dyno size
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+if os.environ.get("GUNICORN_SERVER", "asgi") == "wsgi":
+    wsgi_app = "et_jobs.wsgi:application"
+    worker_class = "gthread" if threads > 1 else "sync"
+else:
+    wsgi_app = "et_jobs.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+keepalive = 5
+
+# recycle workers now and then to bound memory growth
+max_requests = 1000
+max_requests_jitter = 100
+
+accesslog = "-"
+errorlog = "-"
@@ -1,14 +1,107 @@
+from datetime import timedelta
+
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.postgres.search import SearchQuery
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.template.response import TemplateResponse
+from django.utils import timezone
+
+from common.paginator import EstimatedCountPaginator
+
+from . import bulk
+from .models import Job, JobCategory, JobApplication, Report, ReportedJob
+
+
+class JobSearchMixin:
+    """Search jobs with their stored search vector instead of icontains scans."""
+
+    search_fields = ["title"]
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        search_query = SearchQuery(search_term, search_type="websearch")
+        return queryset.filter(search_vector=search_query), False
 
-from .models import Job, JobCategory, JobApplication, Report
+
+class RecategorizeForm(forms.Form):
+    category = forms.ModelChoiceField(queryset=JobCategory.objects.order_by("name"))
 
 
 @admin.register(Job)
-class JobAdmin(admin.ModelAdmin):
-    list_display = ["title", "employer", "date_posted", "deadline", "category"]
-    list_filter = ["category", "date_posted", "deadline"]
-    search_fields = ["title", "description"]
+class JobAdmin(JobSearchMixin, admin.ModelAdmin):
+    list_display = ["title", "employer", "published_at", "deadline", "category"]
+    list_filter = [
+        "status",
+        "category",
+        ("source_link", admin.EmptyFieldListFilter),
+        "published_at",
+        "deadline",
+    ]
+    list_select_related = ["employer", "category"]
     prepopulated_fields = {"slug": ["title"]}
+    autocomplete_fields = ["category", "employer"]
+    raw_id_fields = ["duplicate_of"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    actions = ["publish_jobs", "unpublish_jobs", "recategorize_jobs", "expire_jobs"]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer("description")
+
+    def update_jobs(self, request, queryset, values, done):
+        """Update the selected jobs in chunks and report how many changed."""
+        updated = bulk.update_jobs(queryset, values)
+        chunks = -(-updated // bulk.CHUNK_SIZE)
+        self.message_user(request, f"{updated} jobs {done} in {chunks} batches.")
+
+    @admin.action(description="Publish selected jobs")
+    def publish_jobs(self, request, queryset):
+        # jobs published before keep their place in listings
+        published_at = Coalesce("published_at", Value(timezone.now()))
+        self.update_jobs(
+            request, queryset, {"status": 1, "published_at": published_at}, "published"
+        )
+
+    @admin.action(description="Unpublish selected jobs")
+    def unpublish_jobs(self, request, queryset):
+        self.update_jobs(request, queryset, {"status": 0}, "unpublished")
+
+    @admin.action(description="Close selected jobs for applications")
+    def expire_jobs(self, request, queryset):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        self.update_jobs(request, queryset, {"deadline": yesterday}, "expired")
+
+    @admin.action(description="Move selected jobs to another category")
+    def recategorize_jobs(self, request, queryset):
+        form = RecategorizeForm(request.POST if "apply" in request.POST else None)
+        if form.is_valid():
+            category = form.cleaned_data["category"]
+            self.update_jobs(
+                request, queryset, {"category": category}, f"moved to {category}"
+            )
+            return None
+
+        select_across = request.POST.get("select_across") == "1"
+        context = {
+            **self.admin_site.each_context(request),
+            "title": "Move jobs to another category",
+            "opts": self.model._meta,
+            "form": form,
+            "action": "recategorize_jobs",
+            "select_across": select_across,
+            # all the filtered jobs are selected again from the query string
+            "selected": (
+                [] if select_across else request.POST.getlist(ACTION_CHECKBOX_NAME)
+            ),
+            "action_checkbox_name": ACTION_CHECKBOX_NAME,
+            "count": queryset.count(),
+        }
+        return TemplateResponse(request, "admin/jobs/job/recategorize.html", context)
 
 
 @admin.register(JobCategory)
@@ -23,9 +116,74 @@ class JobCategoryAdmin(admin.ModelAdmin):
 class JobApplicationAdmin(admin.ModelAdmin):
     list_display = ["jobseeker", "job", "timestamp", "status"]
     list_filter = ["status"]
+    list_select_related = ["jobseeker__user", "job"]
+    raw_id_fields = ["job", "jobseeker"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer("job__description")
 
 
 @admin.register(Report)
 class ReportAdmin(admin.ModelAdmin):
     list_display = ["job", "user", "reason", "timestamp"]
     list_filter = ["reason"]
+    list_select_related = ["job", "user__user"]
+    raw_id_fields = ["job", "user"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer("job__description")
+
+
+class ReportInline(admin.TabularInline):
+    model = Report
+    fields = ["user", "reason", "detail", "timestamp"]
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ReportedJob)
+class ReportedJobAdmin(JobSearchMixin, admin.ModelAdmin):
+    """
+    Moderation queue: reported jobs, most suspicious first. The report
+    counters are aggregated on the job, so the queue needs no GROUP BY.
+    """
+
+    list_display = ["title", "employer", "report_count", "report_score", "is_hidden"]
+    list_filter = ["is_hidden"]
+    list_select_related = ["employer"]
+    fields = ["title", "employer", "report_count", "report_score", "is_hidden"]
+    readonly_fields = ["title", "employer", "report_count", "report_score"]
+    inlines = [ReportInline]
+    actions = ["hide_jobs", "restore_jobs"]
+    list_per_page = 50
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .filter(report_count__gt=0)
+            .defer("description")
+            .order_by("-report_score", "-report_count")
+        )
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Hide selected jobs from listings")
+    def hide_jobs(self, request, queryset):
+        hidden = bulk.update_jobs(queryset, {"is_hidden": True})
+        self.message_user(request, f"{hidden} jobs hidden.")
+
+    @admin.action(description="Restore selected jobs and clear their report score")
+    def restore_jobs(self, request, queryset):
+        restored = bulk.update_jobs(queryset, {"is_hidden": False, "report_score": 0})
+        self.message_user(request, f"{restored} jobs restored.")
@@ -0,0 +1,46 @@
+"""
+Bulk updates of jobs, as used by the admin actions.
+
+The selected jobs are updated with queryset.update() in chunks of
+CHUNK_SIZE ids, one transaction per chunk, so updating tens of thousands
+of jobs neither runs Job.save() per row nor holds row locks on all of
+them at once. Listeners of jobs_bulk_updated (e.g. caches) are notified
+once, with every updated id.
+"""
+
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SEARCHED_FIELDS, Job, update_search_vectors
+from .signals import jobs_bulk_updated
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+
+
+def update_jobs(queryset, values, chunk_size=CHUNK_SIZE):
+    """
+    Set the given field values on the jobs of the queryset and return the
+    number of updated jobs. updated_at is set as well, since update()
+    skips auto_now, and so are the search vectors when a searched field
+    changed. Progress is logged after every chunk.
+    """
+    values = {**values, "updated_at": timezone.now()}
+    job_ids = list(queryset.order_by().values_list("pk", flat=True))
+    total = len(job_ids)
+    updated = 0
+    for start in range(0, total, chunk_size):
+        chunk = job_ids[start : start + chunk_size]
+        with transaction.atomic():
+            updated += Job.objects.filter(pk__in=chunk).update(**values)
+            if SEARCHED_FIELDS.intersection(values):
+                # after the UPDATE above, whose SET reads the old values
+                update_search_vectors(Job.objects.filter(pk__in=chunk))
+        logger.info("Updated %s of %s jobs: %s", start + len(chunk), total, values)
+
+    if job_ids:
+        jobs_bulk_updated.send(sender=Job, job_ids=job_ids, fields=list(values))
+    return updated
@@ -0,0 +1,70 @@
+"""
+Job cards of the job listings, rendered once per version of a job.
+
+A card looks the same to every visitor except for its bookmark button, so
+its HTML is cached with a placeholder where the button's label goes and
+render_cards() fills in the label for the current user. The cards of a
+page are read from the cache with a single get_many(), and only the
+missing ones are rendered. A card's key includes the versions of its job
+and employer (see common.cache), so changing either renders it again.
+Without a shared cache the versions wouldn't reach the other workers, so
+the key includes the job's updated_at instead, read from the database.
+"""
+
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from common import cache
+
+CARD_TEMPLATE = "jobs/includes/job_card.html"
+CACHE_TIMEOUT = 24 * 60 * 60
+
+BOOKMARK_PLACEHOLDER = "<!-- bookmark -->"
+SAVED = '<i class="fas fa-bookmark me-2"></i>Unsave'
+NOT_SAVED = '<i class="far fa-bookmark me-2"></i>Save'
+
+
+def card_entities(job):
+    return [("job", job.pk), ("employer", job.employer_id)]
+
+
+def card_keys(jobs, actions):
+    """Return the cache keys of the cards of the jobs, reading versions once."""
+    name = "job_card:actions" if actions else "job_card:plain"
+    if not cache.is_shared():
+        return [f"{name}:{job.pk}:{job.updated_at.timestamp()}" for job in jobs]
+    versions = cache.get_versions(
+        entity for job in jobs for entity in card_entities(job)
+    )
+    return [cache.make_key(name, card_entities(job), versions) for job in jobs]
+
+
+def render_card(job, actions):
+    context = {
+        "job": job,
+        "actions": actions,
+        "bookmark_placeholder": BOOKMARK_PLACEHOLDER,
+    }
+    return render_to_string(CARD_TEMPLATE, context)
+
+
+def render_cards(jobs, saved_job_ids=(), actions=True):
+    """
+    Return the HTML of the cards of the jobs, with the bookmark buttons of
+    the saved_job_ids showing "Unsave". Without actions, cards have no
+    bookmark and report menu.
+    """
+    jobs = list(jobs)
+    keys = card_keys(jobs, actions)
+    cached = cache.get_many("job_card", keys)
+    rendered = {}
+    cards = []
+    for job, key in zip(jobs, keys):
+        html = cached.get(key)
+        if html is None:
+            html = rendered[key] = render_card(job, actions)
+        label = SAVED if job.pk in saved_job_ids else NOT_SAVED
+        cards.append(html.replace(BOOKMARK_PLACEHOLDER, label))
+    if rendered:
+        cache.get_cache().set_many(rendered, CACHE_TIMEOUT)
+    return mark_safe("".join(cards))
@@ -0,0 +1,247 @@
+"""
+Near-duplicate detection for aggregated job posts.
+
+Each job gets a MinHash signature over word shingles of its normalized
+title, employer and description. The signature is split into bands and
+every band is hashed into an LSH bucket, so a new post is only compared
+with the jobs sharing at least one bucket with it. A candidate whose
+estimated Jaccard similarity reaches DUPLICATE_THRESHOLD makes the new
+post a duplicate of the (oldest) job it reposts.
+
+Only aggregated posts (jobs with a source_link) are signed, and only live
+jobs (published, not hidden and open for applications) can be reposted:
+a post relisting an expired or removed vacancy is not a duplicate.
+"""
+
+import random
+import re
+from hashlib import blake2b
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from common import cache
+
+from .models import Job, JobSignature, JobSignatureBucket
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+DUPLICATE_THRESHOLD = 0.8
+BATCH_SIZE = 500
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+# fixed seed: signatures must be comparable across processes and deploys
+_random = random.Random(20220609)
+PERMUTATIONS = [
+    (_random.randrange(1, MERSENNE_PRIME), _random.randrange(0, MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+WORD_RE = re.compile(r"\w+")
+
+
+def normalize(text):
+    """Return the lowercase words of the given (possibly HTML) text."""
+    if not text:
+        return []
+    return WORD_RE.findall(strip_tags(text.replace("<", " <")).lower())
+
+
+def stable_hash(value):
+    """64 bit hash of a string that is the same in every process."""
+    digest = blake2b(value.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def shingles(title, employer, description):
+    """Return the set of word shingles describing a job."""
+    words = normalize(title) + normalize(employer) + normalize(description)
+    if len(words) <= SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {
+        " ".join(words[i : i + SHINGLE_SIZE])
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash(shingle_set):
+    """Return the MinHash signature of a set of shingles."""
+    hashes = [stable_hash(shingle) for shingle in shingle_set]
+    if not hashes:
+        return [MAX_HASH] * NUM_PERMUTATIONS
+    return [
+        min(((a * value + b) % MERSENNE_PRIME) & MAX_HASH for value in hashes)
+        for a, b in PERMUTATIONS
+    ]
+
+
+def buckets(signature):
+    """Return the LSH buckets (one per band) of a signature."""
+    result = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND : (band + 1) * ROWS_PER_BAND]
+        # signed, so it fits in a BigIntegerField
+        digest = blake2b(repr((band, rows)).encode(), digest_size=8).digest()
+        result.append(int.from_bytes(digest, "big", signed=True))
+    return result
+
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of the jobs having the given signatures."""
+    same = sum(1 for a, b in zip(signature, other) if a == b)
+    return same / NUM_PERMUTATIONS
+
+
+def job_signature(job):
+    """Return the MinHash signature of a job instance."""
+    return minhash(shingles(job.title, str(job.employer), job.description))
+
+
+def live_jobs():
+    """Return the jobs a new post may be a duplicate of."""
+    return Job.objects.filter(status=1, is_hidden=False).filter(
+        Q(deadline__isnull=True) | Q(deadline__gte=timezone.now().date())
+    )
+
+
+def aggregated_jobs():
+    """Return the jobs that are signed: posts aggregated from other sites."""
+    return Job.objects.exclude(source_link=None).exclude(source_link="")
+
+
+def find_original(signature, candidates):
+    """
+    Return the id of the job the signature is a duplicate of, or None.
+
+    candidates is an iterable of (job_id, duplicate_of_id, signature) of
+    live jobs.
+    """
+    best_score, original = DUPLICATE_THRESHOLD, None
+    for job_id, duplicate_of_id, other in candidates:
+        score = similarity(signature, other)
+        if score >= best_score:
+            best_score = score
+            # always point at the original post, not at another repost
+            original = duplicate_of_id or job_id
+    return original
+
+
+def register_job(job):
+    """
+    Index the given job and mark it as a duplicate if it reposts a job
+    already indexed. Return the id of the original job or None.
+    """
+    signature = job_signature(job)
+    job_buckets = buckets(signature)
+
+    candidate_ids = JobSignatureBucket.objects.filter(
+        bucket__in=job_buckets, job_id__lt=job.pk
+    ).values("job_id")
+    candidates = JobSignature.objects.filter(
+        job_id__in=candidate_ids, job__in=live_jobs()
+    ).values_list("job_id", "job__duplicate_of_id", "minhash")
+    original = find_original(signature, candidates)
+
+    with transaction.atomic():
+        JobSignature.objects.update_or_create(job=job, defaults={"minhash": signature})
+        JobSignatureBucket.objects.filter(job=job).delete()
+        JobSignatureBucket.objects.bulk_create(
+            JobSignatureBucket(job=job, bucket=bucket) for bucket in job_buckets
+        )
+        Job.objects.filter(pk=job.pk).update(duplicate_of=original)
+    job.duplicate_of_id = original
+    cache.bump("job", job.pk)
+    return original
+
+
+def backfill(rebuild=False):
+    """
+    Index every aggregated job that has no signature yet, oldest first,
+    and return the number of duplicates found.
+
+    The LSH index is kept in memory while backfilling so each job costs
+    no query of its own; rows are written in batches.
+    """
+    if rebuild:
+        with transaction.atomic():
+            JobSignatureBucket.objects.all().delete()
+            JobSignature.objects.all().delete()
+            Job.objects.exclude(duplicate_of=None).update(duplicate_of=None)
+
+    index = {}
+    signatures = {}
+    originals = {}
+    indexed = JobSignature.objects.values_list(
+        "job_id", "job__duplicate_of_id", "minhash"
+    )
+    for job_id, duplicate_of_id, signature in indexed.iterator(chunk_size=BATCH_SIZE):
+        signatures[job_id] = signature
+        originals[job_id] = duplicate_of_id
+        for bucket in buckets(signature):
+            index.setdefault(bucket, []).append(job_id)
+
+    live = set(live_jobs().values_list("pk", flat=True))
+    jobs = (
+        aggregated_jobs()
+        .filter(signature__isnull=True)
+        .order_by("pk")
+        .values_list("pk", "title", "employer__company_name", "description")
+    )
+    found = 0
+    batch = []
+    for pk, title, employer, description in jobs.iterator(chunk_size=BATCH_SIZE):
+        signature = minhash(shingles(title, employer, description))
+        job_buckets = buckets(signature)
+        candidate_ids = {
+            job_id
+            for bucket in job_buckets
+            for job_id in index.get(bucket, ())
+            if job_id < pk and job_id in live
+        }
+        original = find_original(
+            signature,
+            (
+                (job_id, originals[job_id], signatures[job_id])
+                for job_id in candidate_ids
+            ),
+        )
+        found += original is not None
+
+        signatures[pk] = signature
+        originals[pk] = original
+        for bucket in job_buckets:
+            index.setdefault(bucket, []).append(pk)
+        batch.append((pk, signature, job_buckets, original))
+        if len(batch) == BATCH_SIZE:
+            _store_batch(batch)
+            batch = []
+    if batch:
+        _store_batch(batch)
+    if found or rebuild:
+        # duplicates were set with bulk_update(), which sends no post_save
+        cache.bump("job")
+    return found
+
+
+def _store_batch(batch):
+    with transaction.atomic():
+        JobSignature.objects.bulk_create(
+            JobSignature(job_id=pk, minhash=signature) for pk, signature, _, _ in batch
+        )
+        JobSignatureBucket.objects.bulk_create(
+            JobSignatureBucket(job_id=pk, bucket=bucket)
+            for pk, _, job_buckets, _ in batch
+            for bucket in job_buckets
+        )
+        duplicates = [
+            Job(pk=pk, duplicate_of_id=original)
+            for pk, _, _, original in batch
+            if original is not None
+        ]
+        Job.objects.bulk_update(duplicates, ["duplicate_of"])
@@ -0,0 +1,180 @@
+"""
+Exports of the applicants of a job.
+
+Exports are streamed: applications are read from the database in chunks
+with iterator() and every row, or every chunk of a resume, is sent as
+soon as it is written, so memory use stays the same for ten applicants
+or ten thousand.
+"""
+
+import csv
+import os
+import zipfile
+
+from django.urls import reverse
+from django.utils.text import get_valid_filename
+
+from .models import JobApplication
+
+BATCH_SIZE = 2000
+# bytes of a resume read at a time while zipping
+READ_SIZE = 64 * 1024
+ARCHIVED = 3
+
+HEADER = [
+    "First name",
+    "Last name",
+    "Email",
+    "Status",
+    "Applied at",
+    "Resume",
+    "Profile",
+]
+
+# spreadsheet apps run cells starting with these as formulas
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+class Echo:
+    """A file-like object returning what is written to it, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def job_applications(job, status=None):
+    """Return the applications of the job, with the given status if any."""
+    applications = JobApplication.objects.filter(job=job)
+    if status is not None:
+        applications = applications.filter(status=status)
+    return applications
+
+
+def parse_status(value):
+    """Return the application status in a query string value, or None."""
+    try:
+        status = int(value)
+    except (TypeError, ValueError):
+        return None
+    return status if status in dict(JobApplication.APPLICATION_STATUS) else None
+
+
+def safe_cell(value):
+    """Keep spreadsheet apps from running values typed by users as formulas."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def applicant_rows(job, build_url, status=None):
+    """
+    Yield the header and a row per applicant of the job. build_url turns
+    the paths of resumes and applicant pages into absolute URLs.
+    """
+    statuses = dict(JobApplication.APPLICATION_STATUS)
+    storage = JobApplication._meta.get_field("resume").storage
+    applications = (
+        job_applications(job, status)
+        .order_by("pk")
+        .values_list(
+            "jobseeker__user__first_name",
+            "jobseeker__user__last_name",
+            "jobseeker__user__email",
+            "jobseeker__user__uid",
+            "status",
+            "timestamp",
+            "resume",
+        )
+    )
+    yield HEADER
+    for row in applications.iterator(chunk_size=BATCH_SIZE):
+        first_name, last_name, email, uid, status, timestamp, resume = row
+        profile = reverse(
+            "jobs:job-applicant-detail", kwargs={"slug": job.slug, "uid": uid}
+        )
+        yield [
+            safe_cell(first_name),
+            safe_cell(last_name),
+            safe_cell(email),
+            statuses[status],
+            timestamp.strftime("%Y-%m-%d %H:%M"),
+            build_url(storage.url(resume)) if resume else "",
+            build_url(profile),
+        ]
+
+
+def csv_lines(rows):
+    """Yield the rows as CSV lines, starting with a BOM for Excel."""
+    writer = csv.writer(Echo())
+    yield "\ufeff"
+    for row in rows:
+        yield writer.writerow(row)
+
+
+class ZipStream:
+    """
+    A write-only file object for zipfile that keeps what is written until
+    it is taken with pop(). It can't seek or tell, so zipfile writes every
+    entry's sizes and checksum after its data instead of going back.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def resume_entry_name(first_name, last_name, uid, resume):
+    extension = os.path.splitext(resume)[1].lower()
+    return get_valid_filename(f"{first_name}_{last_name}_{uid}{extension}")
+
+
+def resume_zip(job, status=None):
+    """
+    Yield a ZIP archive of the resumes of the job's applications with the
+    given status, or of the ones not archived. Resumes missing from the
+    storage are listed in missing.txt instead.
+    """
+    storage = JobApplication._meta.get_field("resume").storage
+    applications = job_applications(job, status)
+    if status is None:
+        applications = applications.exclude(status=ARCHIVED)
+    applications = applications.order_by("pk").values_list(
+        "jobseeker__user__first_name",
+        "jobseeker__user__last_name",
+        "jobseeker__user__uid",
+        "resume",
+    )
+
+    stream = ZipStream()
+    missing = []
+    # resumes are PDF and DOCX files, which are compressed already
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_STORED) as archive:
+        for row in applications.iterator(chunk_size=BATCH_SIZE):
+            first_name, last_name, uid, resume = row
+            name = resume_entry_name(first_name, last_name, uid, resume)
+            try:
+                source = storage.open(resume, "rb") if resume else None
+            except FileNotFoundError:
+                source = None
+            if source is None:
+                missing.append(f"{first_name} {last_name}")
+                continue
+            with source, archive.open(name, "w") as entry:
+                while chunk := source.read(READ_SIZE):
+                    entry.write(chunk)
+                    yield stream.pop()
+            yield stream.pop()
+        if missing:
+            archive.writestr("missing.txt", "\n".join(missing) + "\n")
+    yield stream.pop()
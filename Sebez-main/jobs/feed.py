@@ -0,0 +1,175 @@
+"""
+Batch ranking of the personalized job feed shown to job seekers.
+
+A seeker's bookmarks and applications give an affinity for job categories
+and, through the similar jobs index, for individual jobs. Published jobs
+are ranked by that affinity (decayed by age) and the ids of the best
+matches are stored in JobFeed, so serving a feed page costs one key
+lookup plus one id__in fetch.
+"""
+
+import heapq
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.models import Bookmark
+
+from .models import Job, JobApplication, JobFeed, Report, SimilarJob
+
+FEED_SIZE = 200
+BATCH_SIZE = 500
+
+# how much each kind of signal tells about the interests of a seeker
+BOOKMARK_WEIGHT = 1
+APPLICATION_WEIGHT = 2
+
+# a job loses half of its score every HALF_LIFE
+HALF_LIFE = timedelta(days=14)
+
+
+def load_signals():
+    """Return {user_id: Counter({job_id: weight})} of all job seekers."""
+    signals = defaultdict(Counter)
+    bookmarks = Bookmark.objects.filter(user__account_type=1).values_list(
+        "user_id", "job_id"
+    )
+    for user_id, job_id in bookmarks.iterator(chunk_size=BATCH_SIZE):
+        signals[user_id][job_id] += BOOKMARK_WEIGHT
+    applications = JobApplication.objects.values_list("jobseeker__user_id", "job_id")
+    for user_id, job_id in applications.iterator(chunk_size=BATCH_SIZE):
+        signals[user_id][job_id] += APPLICATION_WEIGHT
+    return signals
+
+
+def load_exclusions():
+    """Return {user_id: job ids} that must never show up in the user's feed."""
+    exclusions = defaultdict(set)
+    applications = JobApplication.objects.values_list("jobseeker__user_id", "job_id")
+    reports = Report.objects.values_list("user__user_id", "job_id")
+    bookmarks = Bookmark.objects.values_list("user_id", "job_id")
+    for rows in (applications, reports, bookmarks):
+        for user_id, job_id in rows.iterator(chunk_size=BATCH_SIZE):
+            exclusions[user_id].add(job_id)
+    return exclusions
+
+
+def load_jobs():
+    """Return {job_id: (category_id, recency)} of the jobs open for applications."""
+    now = timezone.now()
+    open_jobs = (
+        Job.objects.filter(status=1, duplicate_of=None, is_hidden=False)
+        .filter(Q(deadline__isnull=True) | Q(deadline__gte=now.date()))
+        .order_by()
+        # jobs published by queryset.update() may have no publication time
+        .annotate(published=Coalesce("published_at", "created_at"))
+        .values_list("pk", "category_id", "published")
+    )
+    return {
+        pk: (category_id, 0.5 ** ((now - published_at) / HALF_LIFE))
+        for pk, category_id, published_at in open_jobs.iterator(chunk_size=BATCH_SIZE)
+    }
+
+
+def load_neighbours():
+    """Return {job_id: [(similar_id, score), ...]} from the similar jobs index."""
+    neighbours = defaultdict(list)
+    rows = SimilarJob.objects.order_by().values_list("job_id", "similar_id", "score")
+    for job_id, similar_id, score in rows.iterator(chunk_size=BATCH_SIZE):
+        neighbours[job_id].append((similar_id, score))
+    return neighbours
+
+
+def index_by_category(jobs):
+    """Return {category_id: [(job_id, recency), ...]} of the load_jobs() jobs."""
+    by_category = defaultdict(list)
+    for job_id, (category_id, recency) in jobs.items():
+        by_category[category_id].append((job_id, recency))
+    return by_category
+
+
+def rank_jobs(
+    interests, excluded, jobs, by_category, categories_of, neighbours, size=FEED_SIZE
+):
+    """
+    Return the ids of the jobs matching the given interests best. Only the
+    jobs of the categories the user showed interest in and the neighbours
+    of the jobs they interacted with are scored, not every open job.
+    """
+    category_affinity = Counter()
+    job_affinity = Counter()
+    for job_id, weight in interests.items():
+        category_id = categories_of.get(job_id)
+        if category_id is not None:
+            category_affinity[category_id] += weight
+        for similar_id, score in neighbours.get(job_id, ()):
+            job_affinity[similar_id] += weight * score
+
+    total = sum(category_affinity.values()) or 1
+    scores = {}
+    for category_id, affinity in category_affinity.items():
+        for job_id, recency in by_category.get(category_id, ()):
+            if job_id not in excluded:
+                scores[job_id] = affinity / total * recency
+    for job_id, affinity in job_affinity.items():
+        if job_id in jobs and job_id not in excluded:
+            recency = jobs[job_id][1]
+            scores[job_id] = scores.get(job_id, 0) + affinity * recency
+    return heapq.nlargest(size, scores, key=scores.get)
+
+
+def store_feeds(feeds):
+    """Create or replace the stored feeds {user_id: job ids}."""
+    with transaction.atomic():
+        existing = JobFeed.objects.filter(user_id__in=feeds).in_bulk(
+            field_name="user_id"
+        )
+        now = timezone.now()
+        for user_id, feed in existing.items():
+            feed.job_ids = feeds[user_id]
+            feed.updated_at = now
+        JobFeed.objects.bulk_update(existing.values(), ["job_ids", "updated_at"])
+        JobFeed.objects.bulk_create(
+            JobFeed(user_id=user_id, job_ids=job_ids)
+            for user_id, job_ids in feeds.items()
+            if user_id not in existing
+        )
+
+
+def build_feeds(size=FEED_SIZE):
+    """Rebuild the feeds of all job seekers and return how many were stored."""
+    signals = load_signals()
+    exclusions = load_exclusions()
+    jobs = load_jobs()
+    by_category = index_by_category(jobs)
+    neighbours = load_neighbours()
+    # categories of every job a seeker interacted with, including closed ones
+    categories_of = dict(
+        Job.objects.filter(Q(bookmark__isnull=False) | Q(applications__isnull=False))
+        .order_by()
+        .values_list("pk", "category_id")
+        .distinct()
+    )
+
+    stale = set(JobFeed.objects.values_list("user_id", flat=True)) - set(signals)
+    JobFeed.objects.filter(user_id__in=stale).delete()
+
+    user_ids = sorted(signals)
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        feeds = {}
+        for user_id in user_ids[start : start + BATCH_SIZE]:
+            feeds[user_id] = rank_jobs(
+                signals[user_id],
+                exclusions[user_id],
+                jobs,
+                by_category,
+                categories_of,
+                neighbours,
+                size,
+            )
+        store_feeds(feeds)
+    return len(user_ids)
@@ -0,0 +1,78 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template import Context, Engine
+
+from common import cache
+from jobs import cards
+from jobs.models import Job
+
+
+class Command(BaseCommand):
+    """
+    Time the rendering of a page of job cards three ways: parsing the card
+    template for every render (as without the cached loader), with the
+    cached loader but no cached cards, and with every card cached. The
+    bookmark state is filled in all three, so the numbers compare pages a
+    visitor would actually get.
+    """
+
+    help = "Benchmark the rendering of a page of job cards."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cards", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options):
+        jobs = list(
+            Job.objects.filter(status=1, duplicate_of=None, is_hidden=False)
+            .select_related("employer")
+            .defer("description")[: options["cards"]]
+        )
+        if not jobs:
+            raise CommandError("There are no published jobs to render.")
+        keys = cards.card_keys(jobs, True)
+        saved_job_ids = {jobs[0].pk}
+        engine = Engine(
+            loaders=[
+                "django.template.loaders.filesystem.Loader",
+                "django.template.loaders.app_directories.Loader",
+            ]
+        )
+
+        def parsed_every_time():
+            cache.get_cache().delete_many(keys)
+            for job in jobs:
+                template = engine.get_template(cards.CARD_TEMPLATE)
+                html = template.render(
+                    Context(
+                        {
+                            "job": job,
+                            "actions": True,
+                            "bookmark_placeholder": cards.BOOKMARK_PLACEHOLDER,
+                        }
+                    )
+                )
+                html.replace(cards.BOOKMARK_PLACEHOLDER, cards.NOT_SAVED)
+
+        def cached_loader():
+            cache.get_cache().delete_many(keys)
+            cards.render_cards(jobs, saved_job_ids)
+
+        def cached_cards():
+            cards.render_cards(jobs, saved_job_ids)
+
+        for label, render in [
+            ("template parsed per card", parsed_every_time),
+            ("cached template loader", cached_loader),
+            ("cached cards", cached_cards),
+        ]:
+            render()
+            start = time.perf_counter()
+            for _ in range(options["repeat"]):
+                render()
+            elapsed = (time.perf_counter() - start) / options["repeat"]
+            self.stdout.write(
+                f"{label}: {elapsed * 1000:.2f} ms per page of {len(jobs)} cards"
+            )
+        cache.get_cache().delete_many(keys)
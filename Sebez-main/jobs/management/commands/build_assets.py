@@ -0,0 +1,43 @@
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from common import assets
+from common.storage import BundlingStaticFilesStorage
+
+
+class Command(BaseCommand):
+    """
+    Collect the static files with the bundling storage (as the deployment
+    does) and report the size of every bundle: sources, minified bundle,
+    and its gzip and brotli variants ("-" when WhiteNoise skipped a variant
+    that wouldn't be smaller).
+    """
+
+    help = "Bundle, minify, fingerprint and compress the static files."
+
+    def handle(self, *args, **options):
+        if not isinstance(staticfiles_storage, BundlingStaticFilesStorage):
+            raise CommandError(
+                "STATICFILES_STORAGE must be common.storage.BundlingStaticFilesStorage "
+                "(see settings_prod.py)."
+            )
+        call_command("collectstatic", interactive=False, verbosity=0)
+
+        for name, sources in settings.ASSET_BUNDLES.items():
+            source_size = sum(os.path.getsize(finders.find(path)) for path in sources)
+            path = staticfiles_storage.path(
+                staticfiles_storage.stored_name(assets.bundle_path(name))
+            )
+            sizes = [
+                f"{os.path.getsize(variant)} B" if os.path.exists(variant) else "-"
+                for variant in [path, path + ".gz", path + ".br"]
+            ]
+            self.stdout.write(
+                f"{os.path.basename(path)}: {len(sources)} files, {source_size} B, "
+                f"minified {sizes[0]}, gzip {sizes[1]}, brotli {sizes[2]}"
+            )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from jobs import feed
+
+
+class Command(BaseCommand):
+    """Precompute the personalized job feed of every job seeker."""
+
+    help = "Rank jobs for each job seeker from their bookmarks and applications."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=feed.FEED_SIZE)
+
+    def handle(self, *args, **options):
+        stored = feed.build_feeds(size=options["size"])
+        self.stdout.write(self.style.SUCCESS(f"Built job feeds of {stored} users."))
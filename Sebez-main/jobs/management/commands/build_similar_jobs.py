@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from jobs import similarity
+
+
+class Command(BaseCommand):
+    """Build the similar jobs index shown on the job detail page."""
+
+    help = "Precompute the most similar jobs of every published job."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only index new jobs and refresh the jobs they are similar to.",
+        )
+        parser.add_argument("--top-k", type=int, default=similarity.TOP_K)
+
+    def handle(self, *args, **options):
+        refreshed = similarity.build_index(
+            incremental=options["incremental"], top_k=options["top_k"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Refreshed similar jobs of {refreshed} jobs.")
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from jobs import sitemaps
+
+
+class Command(BaseCommand):
+    """Write the sitemaps of the shards of jobs that changed since the last run."""
+
+    help = "Build the gzipped job sitemaps and the sitemap index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--site-url", help="Defaults to the SITE_URL setting.")
+        parser.add_argument(
+            "--full", action="store_true", help="Rewrite every sitemap."
+        )
+
+    def handle(self, *args, **options):
+        written = sitemaps.build_sitemaps(options["site_url"], full=options["full"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} job sitemaps."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from jobs import dedup
+
+
+class Command(BaseCommand):
+    """Find jobs reposting a vacancy that is already listed."""
+
+    help = "Index aggregated jobs without a signature and mark near-duplicates."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Drop the existing signatures and duplicate marks first.",
+        )
+
+    def handle(self, *args, **options):
+        found = dedup.backfill(rebuild=options["rebuild"])
+        self.stdout.write(self.style.SUCCESS(f"Found {found} duplicate jobs."))
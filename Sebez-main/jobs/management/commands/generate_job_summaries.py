@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from common import utils
+from jobs.models import Job, update_search_vectors
+from jobs.signals import jobs_bulk_updated
+
+
+class Command(BaseCommand):
+    """
+    Generate summaries and search vectors for jobs imported in bulk
+    (bulk_create bypasses Job.save, so imported jobs are stored without
+    them).
+    """
+
+    help = "Generate plain text summaries shown in job lists."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help=(
+                "Regenerate summaries of all jobs, not only the missing ones "
+                "(scraped summaries of aggregated jobs are kept)."
+            ),
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        fields = ["pk", "description", "source_link", "summary"]
+        jobs = Job.objects.only(*fields).order_by()
+        if not options["all"]:
+            # an empty summary is generated from an empty description, so
+            # only missing ones are selected
+            jobs = jobs.filter(Q(summary__isnull=True) | Q(search_vector__isnull=True))
+
+        batch = []
+        changed = []
+        for job in jobs.iterator(chunk_size=batch_size):
+            batch.append(job)
+            if len(batch) == batch_size:
+                changed += self.save_batch(batch)
+                batch = []
+        if batch:
+            changed += self.save_batch(batch)
+        if changed:
+            # bulk_update() sends no post_save; updated_at is left alone,
+            # the job itself didn't change
+            jobs_bulk_updated.send(sender=Job, job_ids=changed, fields=["summary"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Generated summaries for {len(changed)} jobs.")
+        )
+
+    def save_batch(self, batch):
+        """Save the summaries that changed and return the ids of their jobs."""
+        changed = []
+        for job in batch:
+            if job.keeps_scraped_summary():
+                continue
+            summary = utils.generate_summary(job.description)
+            if summary != job.summary:
+                job.summary = summary
+                changed.append(job)
+        Job.objects.bulk_update(changed, ["summary"])
+        update_search_vectors(Job.objects.filter(pk__in=[job.pk for job in batch]))
+        return [job.pk for job in changed]
@@ -0,0 +1,40 @@
+from django.db import migrations
+from django.db.models import Q
+
+from common import utils
+
+
+def populate_summaries(apps, schema_editor):
+    Job = apps.get_model("jobs", "Job")
+    # aggregated jobs keep the summary scraped with them (see
+    # Job.keeps_scraped_summary)
+    jobs = (
+        Job.objects.filter(
+            Q(source_link__isnull=True)
+            | Q(source_link="")
+            | Q(summary__isnull=True)
+            | Q(summary="")
+        )
+        .only("pk", "description")
+        .order_by()
+    )
+    batch = []
+    for job in jobs.iterator(chunk_size=500):
+        job.summary = utils.generate_summary(job.description)
+        batch.append(job)
+        if len(batch) == 500:
+            Job.objects.bulk_update(batch, ["summary"])
+            batch = []
+    if batch:
+        Job.objects.bulk_update(batch, ["summary"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0005_report_jobapplication_unique_application_report_job_and_more"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.0.4 on 2026-10-19 05:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0006_populate_job_summaries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbours', to='jobs.job')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='jobs.job')),
+            ],
+            options={
+                'ordering': ['-score'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='similarjob',
+            constraint=models.UniqueConstraint(fields=('job', 'similar'), name='unique_similar_job'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.0.4 on 2026-10-19 05:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('jobs', '0007_similarjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobFeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_ids', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='job_feed', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.0.4 on 2026-10-19 05:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0009_job_duplicates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportedJob',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'reported job',
+                'verbose_name_plural': 'reported jobs',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('jobs.job',),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='is_hidden',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='report_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='report_score',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
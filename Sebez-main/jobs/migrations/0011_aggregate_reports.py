@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+
+# Report.REASON_WEIGHTS when this migration was written
+REASON_WEIGHTS = {1: 3, 2: 3, 3: 1, 4: 1}
+
+
+def aggregate_reports(apps, schema_editor):
+    Job = apps.get_model("jobs", "Job")
+    Report = apps.get_model("jobs", "Report")
+    threshold = getattr(settings, "REPORT_HIDE_THRESHOLD", 5)
+
+    totals = {}
+    reports = Report.objects.order_by().values_list("job_id", "reason")
+    for job_id, reason, count in reports.annotate(count=Count("pk")):
+        report_count, report_score = totals.get(job_id, (0, 0))
+        totals[job_id] = (
+            report_count + count,
+            report_score + count * REASON_WEIGHTS.get(reason, 1),
+        )
+
+    jobs = [
+        Job(
+            pk=job_id,
+            report_count=report_count,
+            report_score=report_score,
+            is_hidden=report_score >= threshold,
+        )
+        for job_id, (report_count, report_score) in totals.items()
+    ]
+    Job.objects.bulk_update(
+        jobs, ["report_count", "report_score", "is_hidden"], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0010_job_report_moderation"),
+    ]
+
+    operations = [
+        migrations.RunPython(aggregate_reports, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.0.4 on 2026-10-19 05:56
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import Max
+
+BATCH_SIZE = 5000
+
+
+def populate_search_vectors(apps, schema_editor):
+    Job = apps.get_model("jobs", "Job")
+    search_vector = (
+        SearchVector("title", weight="A")
+        + SearchVector("location", weight="B")
+        + SearchVector("description", weight="C")
+    )
+    last_pk = Job.objects.aggregate(last_pk=Max("pk"))["last_pk"] or 0
+    for start in range(0, last_pk + 1, BATCH_SIZE):
+        Job.objects.filter(pk__gte=start, pk__lt=start + BATCH_SIZE).update(
+            search_vector=search_vector
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0011_aggregate_reports'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # before the index exists, so the backfill doesn't maintain it
+        migrations.RunPython(populate_search_vectors, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='job',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='job_search_vector'),
+        ),
+    ]
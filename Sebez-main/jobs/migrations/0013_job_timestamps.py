@@ -0,0 +1,56 @@
+# Generated by Django 4.0.4 on 2026-10-19 05:59
+
+from django.db import migrations, models
+from django.db.models import F, Max
+import django.db.models.expressions
+import django.utils.timezone
+
+BATCH_SIZE = 5000
+
+
+def populate_timestamps(apps, schema_editor):
+    """
+    The old date_posted, now updated_at, is the best known creation and
+    publication time of existing jobs.
+    """
+    Job = apps.get_model("jobs", "Job")
+    last_pk = Job.objects.aggregate(last_pk=Max("pk"))["last_pk"] or 0
+    for start in range(0, last_pk + 1, BATCH_SIZE):
+        jobs = Job.objects.filter(pk__gte=start, pk__lt=start + BATCH_SIZE)
+        jobs.update(created_at=F("updated_at"))
+        jobs.filter(status=1).update(published_at=F("updated_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0012_job_search_vector'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='job',
+            options={'ordering': [django.db.models.expressions.OrderBy(django.db.models.expressions.F('published_at'), descending=True, nulls_last=True), '-id']},
+        ),
+        migrations.RenameField(
+            model_name='job',
+            old_name='date_posted',
+            new_name='updated_at',
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='published_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(populate_timestamps, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(django.db.models.expressions.OrderBy(django.db.models.expressions.F('published_at'), descending=True, nulls_last=True), django.db.models.expressions.OrderBy(django.db.models.expressions.F('id'), descending=True), name='job_published_at'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.0.4 on 2026-10-19 06:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0013_job_timestamps'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='level',
+            field=models.SmallIntegerField(blank=True, choices=[(1, 'Entry Level'), (2, 'Mid Level'), (3, 'Senior Level')], null=True, verbose_name='Experience'),
+        ),
+        migrations.AlterField(
+            model_name='jobapplication',
+            name='status',
+            field=models.SmallIntegerField(choices=[(0, 'Pending'), (1, 'Short Listed'), (2, 'Contacted'), (3, 'Archived')], default=0),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.0.4 on 2026-10-19 06:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0015_similarity_terms'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sitemap',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('content', models.BinaryField()),
+                ('site_url', models.CharField(max_length=200)),
+                ('fingerprint', models.JSONField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.0.4 on 2026-10-19 06:46
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_indexed_jobs(apps, schema_editor):
+    # the jobs with postings were vectorized by an earlier build
+    Job = apps.get_model("jobs", "Job")
+    JobTerm = apps.get_model("jobs", "JobTerm")
+    Job.objects.filter(pk__in=JobTerm.objects.values("job_id")).update(
+        similarity_indexed_at=timezone.now()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0016_sitemap'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='similarity_indexed_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(mark_indexed_jobs, migrations.RunPython.noop),
+    ]
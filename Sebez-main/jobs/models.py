@@ -1,8 +1,17 @@
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.db.models import Case, Exists, F, OuterRef, Value, When
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.urls import reverse
+from django.utils import timezone
 import django_filters
 
-from common import utils
+from common import cache, utils
+
+from .signals import jobs_bulk_updated
 
 
 class JobCategory(models.Model):
@@ -24,6 +33,26 @@ class JobCategory(models.Model):
         super().save(*args, **kwargs)
 
 
+# what job search matches, most relevant first
+SEARCH_VECTOR = (
+    SearchVector("title", weight="A")
+    + SearchVector("location", weight="B")
+    + SearchVector("description", weight="C")
+)
+SEARCHED_FIELDS = {"title", "location", "description"}
+# what the near-duplicate signature of an aggregated job (see dedup) is of
+SIGNED_FIELDS = {"title", "employer", "description", "source_link"}
+
+
+def update_search_vectors(jobs):
+    """
+    Recompute the search vectors of the jobs (a queryset). Job.save() does
+    it; code writing jobs with update(), bulk_update() or bulk_create()
+    must call this afterwards, or the jobs aren't found by search.
+    """
+    return jobs.update(search_vector=SEARCH_VECTOR)
+
+
 class Job(models.Model):
     """A class representing job."""
 
@@ -39,7 +68,11 @@ class Job(models.Model):
         verbose_name="Experience", choices=LEVEL, blank=True, null=True
     )
 
-    date_posted = models.DateTimeField(auto_now=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # set by save() the first time the job is published; listings are
+    # ordered by it, so edits and unpublishing don't move a job
+    published_at = models.DateTimeField(blank=True, null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
     deadline = models.DateField(blank=True, null=True)
 
     source_link = models.CharField(max_length=500, blank=True, null=True)
@@ -55,18 +88,69 @@ class Job(models.Model):
 
     job_type = models.SmallIntegerField(choices=EMPLOYMENT_TYPES, default=1)
     status = models.SmallIntegerField(choices=STATUS, default=0)
+    # set on aggregated posts found to repost an already listed vacancy
+    duplicate_of = models.ForeignKey(
+        "self",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="duplicates",
+    )
+    # aggregated by Report's post_save: all reports, and the weighted
+    # reports since a moderator last restored the job
+    report_count = models.PositiveIntegerField(default=0)
+    report_score = models.PositiveIntegerField(default=0)
+    # hidden from listings once report_score reaches REPORT_HIDE_THRESHOLD
+    is_hidden = models.BooleanField(default=False, db_index=True)
+    # SEARCH_VECTOR of the job, kept up to date by save()
+    search_vector = SearchVectorField(null=True, editable=False)
+    # set when the similar jobs index vectorizes the job, so incremental
+    # builds skip it even if none of its terms made it into the index
+    similarity_indexed_at = models.DateTimeField(null=True, editable=False)
 
     def __str__(self):
         return self.title
 
     class Meta:
-        ordering = ["-date_posted"]
+        # newest first, with the id breaking ties so pages are stable
+        ordering = [F("published_at").desc(nulls_last=True), "-id"]
+        indexes = [
+            GinIndex(fields=["search_vector"], name="job_search_vector"),
+            models.Index(
+                F("published_at").desc(nulls_last=True),
+                F("id").desc(),
+                name="job_published_at",
+            ),
+        ]
 
     def save(self, *args, **kwargs):
-        """Assign unique slug from job title (only once)."""
+        """
+        Assign unique slug from job title (only once), stamp the first
+        publication and keep the summary shown in job lists and the search
+        vector in sync with the description.
+        """
         if not self.slug:
             self.slug = utils.generate_slug(self.__class__, self.title)
-        return super().save(*args, **kwargs)
+        if self.status == 1 and self.published_at is None:
+            self.published_at = timezone.now()
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "published_at"}
+        if "description" not in self.get_deferred_fields():
+            if not self.keeps_scraped_summary():
+                self.summary = utils.generate_summary(self.description)
+        super().save(*args, **kwargs)
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or SEARCHED_FIELDS.intersection(update_fields):
+            update_search_vectors(Job.objects.filter(pk=self.pk))
+
+    def keeps_scraped_summary(self):
+        """
+        Aggregated jobs (with a source_link) show the summary scraped with
+        them, and often have no description to generate one from.
+        """
+        return bool(self.source_link and self.summary)
 
     def get_absolute_url(self):
         """Absolute url to job detail"""
@@ -138,6 +222,8 @@ class Report(models.Model):
         (3, "Vague description"),
         (4, "Other"),
     )
+    # how much a report of each reason counts towards hiding the job
+    REASON_WEIGHTS = {1: 3, 2: 3, 3: 1, 4: 1}
 
     job = models.ForeignKey(Job, on_delete=models.DO_NOTHING, related_name="reports")
     user = models.ForeignKey(
@@ -157,3 +243,174 @@ class Report(models.Model):
         constraints = [
             models.UniqueConstraint(fields=["job", "user"], name="unique_report"),
         ]
+
+
+def exclude_reported(jobs, user):
+    """Exclude the jobs reported by the user from a Job queryset (anti-join)."""
+    jobseeker = getattr(user, "jobseeker", None)
+    if jobseeker is None:
+        return jobs
+    reports = Report.objects.filter(job=OuterRef("pk"), user=jobseeker)
+    return jobs.filter(~Exists(reports))
+
+
+class ReportedJob(Job):
+    """Jobs in the moderation queue of the admin."""
+
+    class Meta:
+        proxy = True
+        verbose_name = "reported job"
+        verbose_name_plural = "reported jobs"
+
+
+class SimilarJob(models.Model):
+    """A precomputed neighbour of a job in the similar jobs index."""
+
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name="neighbours")
+    similar = models.ForeignKey(Job, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()
+
+    def __str__(self) -> str:
+        return f"{self.job} ~ {self.similar}"
+
+    class Meta:
+        ordering = ["-score"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["job", "similar"], name="unique_similar_job"
+            ),
+        ]
+
+
+class SimilarityTerm(models.Model):
+    """Inverse document frequency of a term of the similar jobs index."""
+
+    term = models.CharField(max_length=100, primary_key=True)
+    idf = models.FloatField()
+
+    def __str__(self) -> str:
+        return self.term
+
+
+class JobTerm(models.Model):
+    """Weight of a term in the TF-IDF vector of a job, a posting of the index."""
+
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name="+")
+    term = models.CharField(max_length=100, db_index=True)
+    weight = models.FloatField()
+
+    def __str__(self) -> str:
+        return f"{self.term} in {self.job}"
+
+
+class JobFeed(models.Model):
+    """Personalized, precomputed list of jobs recommended to a job seeker."""
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="job_feed"
+    )
+    # ranked ids of recommended jobs, best match first
+    job_ids = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"Job feed of {self.user}"
+
+
+class JobSignature(models.Model):
+    """MinHash signature of a job used to detect near-duplicate posts."""
+
+    job = models.OneToOneField(
+        Job, on_delete=models.CASCADE, primary_key=True, related_name="signature"
+    )
+    minhash = models.JSONField()
+
+    def __str__(self) -> str:
+        return f"Signature of {self.job}"
+
+
+class JobSignatureBucket(models.Model):
+    """LSH bucket (hash of one band of a signature) a job falls into."""
+
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name="+")
+    bucket = models.BigIntegerField(db_index=True)
+
+    def __str__(self) -> str:
+        return f"{self.job} in {self.bucket}"
+
+
+class Sitemap(models.Model):
+    """Sitemap (gzipped, but for the index) written by build_sitemaps."""
+
+    name = models.CharField(max_length=100, primary_key=True)
+    content = models.BinaryField()
+    site_url = models.CharField(max_length=200)
+    # of the jobs of a shard; only shards whose fingerprint changed are
+    # written again
+    fingerprint = models.JSONField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return self.name
+
+
+# proxies get their own signals, and the moderation queue edits ReportedJob
+@receiver(post_save, sender=Job)
+@receiver(post_save, sender=ReportedJob)
+def detect_duplicate_post(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Check aggregated posts against the jobs already listed."""
+    from . import dedup
+
+    if not instance.source_link or raw:
+        return
+    # e.g. status changes or the report counters don't change the signature
+    if update_fields is None or SIGNED_FIELDS.intersection(update_fields):
+        dedup.register_job(instance)
+
+
+@receiver(post_save, sender=Report)
+def aggregate_report(sender, instance, created, raw=False, **kwargs):
+    """
+    Add a new report to the counters of its job, hiding the job when its
+    score reaches REPORT_HIDE_THRESHOLD, in a single UPDATE.
+    """
+    if not created or raw:
+        return
+    weight = Report.REASON_WEIGHTS.get(instance.reason, 1)
+    threshold = getattr(settings, "REPORT_HIDE_THRESHOLD", 5)
+    Job.objects.filter(pk=instance.job_id).update(
+        report_count=F("report_count") + 1,
+        report_score=F("report_score") + weight,
+        is_hidden=Case(
+            When(report_score__gte=threshold - weight, then=Value(True)),
+            default=F("is_hidden"),
+        ),
+    )
+    # the job may be hidden now
+    cache.bump("job", instance.job_id)
+
+
+# jobs updated at once above this are invalidated with their namespace
+BULK_BUMP_LIMIT = 100
+
+
+@receiver(post_save, sender=Job)
+@receiver(post_save, sender=ReportedJob)
+@receiver(post_delete, sender=Job)
+@receiver(post_delete, sender=ReportedJob)
+def invalidate_job(sender, instance, **kwargs):
+    cache.bump("job", instance.pk)
+
+
+@receiver(post_save, sender=JobCategory)
+@receiver(post_delete, sender=JobCategory)
+def invalidate_category(sender, instance, **kwargs):
+    cache.bump("category", instance.pk)
+
+
+@receiver(jobs_bulk_updated, sender=Job)
+def invalidate_jobs(sender, job_ids, **kwargs):
+    if len(job_ids) > BULK_BUMP_LIMIT:
+        cache.bump("job")
+    else:
+        cache.bump("job", *job_ids)
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent once after a bulk action updated many jobs with queryset.update(),
+# which sends no post_save. Arguments: job_ids (list of the updated jobs'
+# ids) and fields (names of the updated fields).
+jobs_bulk_updated = Signal()
@@ -0,0 +1,269 @@
+"""
+Offline TF-IDF index used to recommend similar jobs on the job detail page.
+
+Every published job is turned into a sparse, L2 normalised TF-IDF vector
+built from its title, description and category. Cosine similarities are
+computed in batches through an inverted index (a sparse matrix product
+that only touches jobs sharing at least one term) and the top-k
+neighbours of each job are stored in SimilarJob, so serving
+recommendations is a single indexed lookup.
+
+A full build also stores the inverse document frequencies (SimilarityTerm)
+and the vectors (JobTerm, the postings of the inverted index), and stamps
+the similarity_indexed_at of the jobs. An incremental build vectorizes
+only the jobs published since (not stamped yet), with the stored
+frequencies, reads the postings of their terms and merges them
+into the neighbours of the jobs they are similar to. Terms first seen
+after the last full build, and edits of indexed jobs, wait for the next
+full build.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .models import Job, JobTerm, SimilarJob, SimilarityTerm
+
+TOP_K = 5
+BATCH_SIZE = 500
+
+# Terms found in more than this share of the jobs carry almost no signal
+# but make the inverted index (and the batched products) much bigger.
+MAX_DOCUMENT_FREQUENCY = 0.5
+
+# Title and category terms describe a job better than its description.
+TITLE_WEIGHT = 3
+CATEGORY_WEIGHT = 2
+
+# longer "terms" (e.g. URLs) are noise, and don't fit in JobTerm.term
+MAX_TERM_LENGTH = 100
+
+TOKEN_RE = re.compile(r"[a-z][a-z0-9+#]+")
+STOP_WORDS = frozenset(
+    """
+    and are for from has have job jobs the this that with will you your our
+    who all any can not but should must able work working years year
+    """.split()
+)
+
+
+def tokenize(text):
+    """Return the lowercase terms of the given (possibly HTML) text."""
+    if not text:
+        return []
+    text = strip_tags(text.replace("<", " <")).lower()
+    return [
+        term
+        for term in TOKEN_RE.findall(text)
+        if term not in STOP_WORDS and len(term) <= MAX_TERM_LENGTH
+    ]
+
+
+def term_counts(title, description, category):
+    """Weighted term frequencies of a single job."""
+    counts = Counter(tokenize(description))
+    for term in tokenize(title):
+        counts[term] += TITLE_WEIGHT
+    for term in tokenize(category):
+        counts[term] += CATEGORY_WEIGHT
+    return counts
+
+
+def load_corpus(jobs=Job.objects):
+    """Return {job_id: term counts} for the published, original jobs."""
+    rows = (
+        jobs.filter(status=1, duplicate_of=None)
+        .order_by()
+        .values_list("pk", "title", "description", "category__name")
+    )
+    return {
+        pk: term_counts(title, description, category)
+        for pk, title, description, category in rows.iterator(chunk_size=BATCH_SIZE)
+    }
+
+
+def inverse_document_frequencies(corpus):
+    """Return {term: idf} of the terms of the corpus that carry a signal."""
+    total = len(corpus)
+    document_frequency = Counter()
+    for counts in corpus.values():
+        document_frequency.update(counts.keys())
+
+    max_frequency = max(1, int(total * MAX_DOCUMENT_FREQUENCY))
+    return {
+        term: math.log((1 + total) / (1 + frequency)) + 1
+        for term, frequency in document_frequency.items()
+        if frequency <= max_frequency or total < 3
+    }
+
+
+def build_vectors(corpus, idf):
+    """
+    Turn term counts into L2 normalised TF-IDF vectors and return them
+    together with the inverted index {term: [(job_id, weight), ...]}.
+    """
+    vectors = {}
+    postings = defaultdict(list)
+    for pk, counts in corpus.items():
+        vector = {
+            term: (1 + math.log(count)) * idf[term]
+            for term, count in counts.items()
+            if term in idf
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        if not norm:
+            continue
+        vector = {term: weight / norm for term, weight in vector.items()}
+        vectors[pk] = vector
+        for term, weight in vector.items():
+            postings[term].append((pk, weight))
+    return vectors, postings
+
+
+def nearest_neighbours(job_ids, vectors, postings, top_k=TOP_K):
+    """Yield (job_id, [(similar_id, score), ...]) for the given jobs."""
+    for pk in job_ids:
+        vector = vectors.get(pk)
+        if vector is None:
+            yield pk, []
+            continue
+        scores = defaultdict(float)
+        for term, weight in vector.items():
+            for other, other_weight in postings[term]:
+                scores[other] += weight * other_weight
+        scores.pop(pk, None)
+        yield pk, heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+
+def store_neighbours(neighbours):
+    """Replace the stored neighbours of the given jobs."""
+    neighbours = dict(neighbours)
+    with transaction.atomic():
+        SimilarJob.objects.filter(job_id__in=neighbours).delete()
+        SimilarJob.objects.bulk_create(
+            [
+                SimilarJob(job_id=pk, similar_id=other, score=score)
+                for pk, similar in neighbours.items()
+                for other, score in similar
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+
+def store_postings(vectors):
+    JobTerm.objects.bulk_create(
+        (
+            JobTerm(job_id=pk, term=term, weight=weight)
+            for pk, vector in vectors.items()
+            for term, weight in vector.items()
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def mark_indexed(job_ids):
+    """Stamp the jobs as vectorized, including those without any posting."""
+    job_ids = sorted(job_ids)
+    now = timezone.now()
+    for start in range(0, len(job_ids), BATCH_SIZE):
+        batch = job_ids[start : start + BATCH_SIZE]
+        Job.objects.filter(pk__in=batch).update(similarity_indexed_at=now)
+
+
+def store_terms(idf, vectors, job_ids):
+    """Replace the stored frequencies and postings with those of a full build."""
+    with transaction.atomic():
+        SimilarityTerm.objects.all().delete()
+        SimilarityTerm.objects.bulk_create(
+            (SimilarityTerm(term=term, idf=value) for term, value in idf.items()),
+            batch_size=BATCH_SIZE,
+        )
+        JobTerm.objects.all().delete()
+        store_postings(vectors)
+        # jobs left out of the corpus (e.g. unpublished) are indexed again
+        # by an incremental build once they are listed
+        Job.objects.exclude(similarity_indexed_at=None).update(
+            similarity_indexed_at=None
+        )
+        mark_indexed(job_ids)
+
+
+def stored_postings(terms):
+    """Return the stored inverted index of the terms, for listed jobs only."""
+    postings = defaultdict(list)
+    rows = JobTerm.objects.filter(
+        term__in=terms, job__status=1, job__duplicate_of=None
+    ).values_list("job_id", "term", "weight")
+    for pk, term, weight in rows.iterator(chunk_size=BATCH_SIZE):
+        postings[term].append((pk, weight))
+    return postings
+
+
+def index_new_jobs(top_k=TOP_K):
+    """
+    Index the published jobs not vectorized yet, store their
+    neighbours and add them to the neighbours of the jobs they are similar
+    to. Return the number of jobs whose neighbours were refreshed.
+    """
+    corpus = load_corpus(Job.objects.filter(similarity_indexed_at=None))
+    if not corpus:
+        return 0
+    terms = set().union(*corpus.values())
+    idf = dict(SimilarityTerm.objects.filter(term__in=terms).values_list("term", "idf"))
+    vectors, _ = build_vectors(corpus, idf)
+    with transaction.atomic():
+        store_postings(vectors)
+        mark_indexed(corpus)
+    postings = stored_postings(set().union(*vectors.values()))
+    new = dict(nearest_neighbours(sorted(corpus), vectors, postings, top_k))
+
+    # cosine similarity is symmetric: a new job is also a candidate
+    # neighbour of every job it is similar to
+    candidates = defaultdict(list)
+    for pk, similar in new.items():
+        for other, score in similar:
+            if other not in new:
+                candidates[other].append((pk, score))
+    current = SimilarJob.objects.filter(job_id__in=candidates).values_list(
+        "job_id", "similar_id", "score"
+    )
+    for pk, other, score in current:
+        candidates[pk].append((other, score))
+    merged = {
+        pk: heapq.nlargest(top_k, similar, key=lambda item: item[1])
+        for pk, similar in candidates.items()
+    }
+    store_neighbours({**new, **merged})
+    return len(new) + len(merged)
+
+
+def build_index(incremental=False, top_k=TOP_K):
+    """
+    (Re)build the similar jobs index and return the number of jobs whose
+    neighbours were refreshed.
+
+    With incremental=True only jobs published since the last build (new
+    posts) and the jobs they are most similar to are refreshed, without
+    loading the rest of the corpus. Without a previous full build the
+    index is built in full.
+    """
+    if incremental and SimilarityTerm.objects.exists():
+        return index_new_jobs(top_k)
+
+    corpus = load_corpus()
+    idf = inverse_document_frequencies(corpus)
+    vectors, postings = build_vectors(corpus, idf)
+    store_terms(idf, vectors, corpus)
+
+    job_ids = sorted(corpus)
+    # drop neighbours of jobs that are no longer published
+    SimilarJob.objects.exclude(job__status=1).delete()
+    for start in range(0, len(job_ids), BATCH_SIZE):
+        batch = job_ids[start : start + BATCH_SIZE]
+        store_neighbours(nearest_neighbours(batch, vectors, postings, top_k))
+    return len(job_ids)
@@ -0,0 +1,167 @@
+"""
+Precomputed XML sitemaps of the listed jobs and the categories.
+
+Crawlers read sitemap.xml, an index of gzipped sitemaps, instead of
+walking the paginated job list. Jobs are split into shards by primary
+key, SITEMAP_SIZE ids per shard, so no sitemap lists more than the 50,000
+URLs the protocol allows and a new job only changes the last shard.
+
+Sitemaps are stored in the database (Sitemap) and served from there:
+Heroku dynos don't share their filesystem and lose it on every restart.
+Each shard is read with iterator() and values_list() and gzipped as it is
+read, so only the compressed sitemap is held in memory. Every shard keeps
+a fingerprint (count, sum of ids and last update) of its jobs, and only
+shards whose fingerprint changed are written again.
+"""
+
+import gzip
+import io
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Count, F, Max, Sum
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Job, JobCategory, Sitemap
+
+SITEMAP_SIZE = 50000
+BATCH_SIZE = 2000
+
+INDEX_NAME = "sitemap.xml"
+CATEGORIES_NAME = "sitemap-categories.xml.gz"
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+NAMESPACE = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+
+def shard_name(shard):
+    return f"sitemap-jobs-{shard}.xml.gz"
+
+
+def listed_jobs():
+    return Job.objects.filter(status=1, duplicate_of=None, is_hidden=False)
+
+
+def url_entry(site_url, path, last_modified=None):
+    entry = f"<url><loc>{escape(site_url + path)}</loc>"
+    if last_modified is not None:
+        entry += f"<lastmod>{last_modified.isoformat()}</lastmod>"
+    return entry + "</url>\n"
+
+
+def save_sitemap(name, lines, site_url, fingerprint=None):
+    """
+    Store the lines as the named sitemap, gzipped if the name ends in .gz,
+    replacing the old one.
+    """
+    content = io.BytesIO()
+    if name.endswith(".gz"):
+        # mtime=0 keeps the sitemaps of unchanged content identical
+        with gzip.GzipFile(fileobj=content, mode="wb", mtime=0) as file:
+            file.writelines(line.encode() for line in lines)
+    else:
+        content.writelines(line.encode() for line in lines)
+    Sitemap.objects.update_or_create(
+        name=name,
+        defaults={
+            "content": content.getvalue(),
+            "site_url": site_url,
+            "fingerprint": fingerprint,
+        },
+    )
+
+
+def shard_fingerprints():
+    """Return {shard: fingerprint} of the listed jobs, in one query."""
+    shards = (
+        listed_jobs()
+        .order_by()
+        .annotate(shard=F("pk") / SITEMAP_SIZE)
+        .values("shard")
+        .annotate(count=Count("pk"), pk_sum=Sum("pk"), last_modified=Max("updated_at"))
+    )
+    return {
+        row["shard"]: [row["count"], row["pk_sum"], row["last_modified"].isoformat()]
+        for row in shards
+    }
+
+
+def job_lines(shard, site_url):
+    jobs = (
+        listed_jobs()
+        .filter(pk__gte=shard * SITEMAP_SIZE, pk__lt=(shard + 1) * SITEMAP_SIZE)
+        .order_by("pk")
+        .values_list("slug", "updated_at")
+    )
+    yield XML_DECLARATION
+    yield f'<urlset xmlns="{NAMESPACE}">\n'
+    for slug, updated_at in jobs.iterator(chunk_size=BATCH_SIZE):
+        path = reverse("jobs:job-detail", kwargs={"slug": slug})
+        yield url_entry(site_url, path, updated_at)
+    yield "</urlset>\n"
+
+
+def category_lines(site_url):
+    categories = (
+        JobCategory.objects.filter(
+            jobs__status=1, jobs__duplicate_of=None, jobs__is_hidden=False
+        )
+        .annotate(last_published=Max("jobs__published_at"))
+        .order_by("pk")
+        .values_list("slug", "last_published")
+    )
+    yield XML_DECLARATION
+    yield f'<urlset xmlns="{NAMESPACE}">\n'
+    yield url_entry(site_url, reverse("jobs:job-list"))
+    for slug, last_published in categories.iterator(chunk_size=BATCH_SIZE):
+        path = reverse("jobs:job-category", kwargs={"slug": slug})
+        yield url_entry(site_url, path, last_published)
+    yield "</urlset>\n"
+
+
+def index_lines(site_url, sitemaps):
+    """Yield the sitemap index of the (name, last modified) sitemaps."""
+    yield XML_DECLARATION
+    yield f'<sitemapindex xmlns="{NAMESPACE}">\n'
+    for name, last_modified in sitemaps:
+        path = reverse("jobs:sitemap", kwargs={"name": name})
+        yield (
+            f"<sitemap><loc>{escape(site_url + path)}</loc>"
+            f"<lastmod>{last_modified}</lastmod></sitemap>\n"
+        )
+    yield "</sitemapindex>\n"
+
+
+def build_sitemaps(site_url=None, full=False):
+    """
+    Store the sitemaps of the shards that changed since the last build
+    (of all shards if full), the categories sitemap and the index, and
+    delete the sitemaps of emptied shards. Return the number of job
+    shards written.
+    """
+    site_url = (site_url or settings.SITE_URL).rstrip("/")
+    stored = Sitemap.objects.filter(fingerprint__isnull=False).values_list(
+        "name", "site_url", "fingerprint"
+    )
+    previous = {
+        name: None if full or stored_url != site_url else fingerprint
+        for name, stored_url, fingerprint in stored
+    }
+    fingerprints = shard_fingerprints()
+
+    written = 0
+    for shard, fingerprint in fingerprints.items():
+        name = shard_name(shard)
+        if previous.get(name) != fingerprint:
+            save_sitemap(name, job_lines(shard, site_url), site_url, fingerprint)
+            written += 1
+    names = {shard_name(shard) for shard in fingerprints}
+    Sitemap.objects.filter(name__in=set(previous) - names).delete()
+    save_sitemap(CATEGORIES_NAME, category_lines(site_url), site_url)
+
+    sitemaps = [(CATEGORIES_NAME, timezone.now().isoformat())] + [
+        (shard_name(shard), fingerprints[shard][2]) for shard in sorted(fingerprints)
+    ]
+    save_sitemap(INDEX_NAME, index_lines(site_url, sitemaps), site_url)
+    return written
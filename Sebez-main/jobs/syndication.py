@@ -0,0 +1,75 @@
+"""RSS and Atom feeds of the latest published jobs, overall and per category."""
+
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from .models import Job, JobCategory
+
+FEED_ITEMS = 50
+
+
+class LatestJobsFeed(Feed):
+    title = "Latest jobs in Ethiopia | Sebez.com"
+    description = "Jobs published on Sebez.com, newest first."
+
+    def link(self):
+        return reverse("jobs:job-list")
+
+    def jobs(self):
+        return (
+            Job.objects.filter(status=1, duplicate_of=None, is_hidden=False)
+            .select_related("employer", "category")
+            .defer("description", "search_vector")
+        )
+
+    def items(self):
+        return self.jobs()[:FEED_ITEMS]
+
+    def item_title(self, job):
+        return job.title
+
+    def item_description(self, job):
+        return job.summary
+
+    def item_author_name(self, job):
+        return job.employer.company_name
+
+    def item_pubdate(self, job):
+        return job.published_at
+
+    def item_updateddate(self, job):
+        return job.updated_at
+
+    def item_categories(self, job):
+        return [job.category.name]
+
+
+class LatestJobsAtomFeed(LatestJobsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestJobsFeed.description
+
+
+class CategoryJobsFeed(LatestJobsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(JobCategory, slug=slug)
+
+    def title(self, category):
+        return f"Latest {category.name} jobs | Sebez.com"
+
+    def description(self, category):
+        return f"{category.name} jobs published on Sebez.com, newest first."
+
+    def link(self, category):
+        return reverse("jobs:job-category", kwargs={"slug": category.slug})
+
+    def items(self, category):
+        return self.jobs().filter(category=category)[:FEED_ITEMS]
+
+
+class CategoryJobsAtomFeed(CategoryJobsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, category):
+        return self.description(category)
@@ -0,0 +1,18 @@
+from django import template
+from django.utils.html import format_html_join
+
+from common import assets
+
+register = template.Library()
+
+TAGS = {
+    ".css": '<link rel="stylesheet" href="{}" />',
+    ".js": '<script src="{}"></script>',
+}
+
+
+@register.simple_tag
+def asset_bundle(name):
+    """Render the tags loading the named bundle of ASSET_BUNDLES."""
+    tag = TAGS[name[name.rindex(".") :]]
+    return format_html_join("\n  ", tag, ((url,) for url in assets.bundle_urls(name)))
@@ -0,0 +1,11 @@
+from django import template
+
+from jobs import cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def job_cards(jobs, saved_job_ids=(), actions=True):
+    """Render the cached cards of the jobs, see jobs.cards."""
+    return cards.render_cards(jobs, saved_job_ids, actions)
@@ -1,3 +1,1044 @@
-from django.test import TestCase
+import csv
+import datetime
+import gzip
+import io
+import tempfile
+import time
+import zipfile
+from importlib import import_module
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import psycopg2
+from psycopg2 import extensions
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.utils import OperationalError
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import Account, Bookmark
+from common import assets
+from common.paginator import ESTIMATE_THRESHOLD, EstimatedCountPaginator
+from common import cache as versioned_cache
+
+from et_jobs.pooled_postgresql.base import ConnectionPool
+from et_jobs.routers import PIN_COOKIE, ReplicaRouter, ReplicaRoutingMiddleware
+
+from . import bulk, cards, dedup, feed, similarity, sitemaps, views
+from .models import (
+    Job,
+    JobApplication,
+    JobCategory,
+    JobFeed,
+    JobSignature,
+    JobTerm,
+    Report,
+    SimilarJob,
+    Sitemap,
+)
+from .signals import jobs_bulk_updated
+
+
+class JobTestCase(TestCase):
+    """
+    A TestCase with an employer, a category and JOB_COUNT jobs of the
+    employer, created once per class.
+    """
+
+    JOB_COUNT = 2
+    JOB_STATUS = 1
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.account = Account.objects.create_user(
+            "employer@example.com", "Em", "Ployer", "password", account_type=2
+        )
+        cls.employer = cls.account.employer_profile
+        cls.category = JobCategory.objects.create(name="Software", slug="software")
+        cls.jobs = [cls.create_job(f"Job {i}") for i in range(cls.JOB_COUNT)]
+
+    @classmethod
+    def create_job(cls, title, status=None, **fields):
+        fields.setdefault("description", "<p>Do things.</p>")
+        fields.setdefault("category", cls.category)
+        return Job.objects.create(
+            title=title,
+            employer=cls.employer,
+            status=cls.JOB_STATUS if status is None else status,
+            **fields,
+        )
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"])
+class ReplicaRoutingTests(SimpleTestCase):
+    """Reads of read-heavy views go to a replica unless the client just wrote."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+    def route(self, request, view, write=False):
+        """Return the database job reads were routed to while handling request."""
+        used = {}
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            used["read"] = self.router.db_for_read(Job)
+            if write:
+                self.router.db_for_write(Job)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        response = middleware(request)
+        return used["read"], response
+
+    def test_read_only_view_reads_from_replica(self):
+        db, _ = self.route(self.factory.get("/jobs/"), views.JobList.as_view())
+        self.assertEqual(db, "replica1")
+
+    def test_other_views_read_from_primary(self):
+        db, _ = self.route(self.factory.get("/em/"), views.EmployerHomePage.as_view())
+        self.assertEqual(db, "default")
+
+    def test_unsafe_methods_read_from_primary(self):
+        db, _ = self.route(self.factory.post("/jobs/"), views.JobList.as_view())
+        self.assertEqual(db, "default")
+
+    def test_write_pins_client_to_primary(self):
+        _, response = self.route(
+            self.factory.post("/ac/bookmark/"), views.JobList.as_view(), write=True
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        request = self.factory.get("/jobs/")
+        request.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        db, _ = self.route(request, views.JobList.as_view())
+        self.assertEqual(db, "default")
+
+    def test_expired_pin_reads_from_replica(self):
+        request = self.factory.get("/jobs/")
+        request.COOKIES[PIN_COOKIE] = str(time.time() - 1)
+        db, _ = self.route(request, views.JobList.as_view())
+        self.assertEqual(db, "replica1")
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Job), "default")
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Connections are reused, bounded and checked before they are reused."""
+
+    def connect(self, healthy=True):
+        connection = mock.MagicMock(closed=0)
+        connection.get_transaction_status.return_value = (
+            extensions.TRANSACTION_STATUS_IDLE
+        )
+        if not healthy:
+            cursor = connection.cursor.return_value.__enter__.return_value
+            cursor.execute.side_effect = psycopg2.OperationalError
+        return connection
+
+    def test_checkout_reuses_connections(self):
+        pool = ConnectionPool("default", max_size=2)
+        first = pool.checkout(self.connect)
+        second = pool.checkout(self.connect)
+        self.assertIsNot(first, second)
+        pool.checkin(first)
+        self.assertIs(pool.checkout(self.connect), first)
+        # recently returned, so no health check
+        first.cursor.assert_not_called()
+        stats = pool.get_stats()
+        self.assertEqual((stats["checkouts"], stats["created"]), (3, 2))
+
+    def test_checkin_rolls_back_open_transactions(self):
+        pool = ConnectionPool("default", max_size=1)
+        connection = pool.checkout(self.connect)
+        connection.get_transaction_status.return_value = (
+            extensions.TRANSACTION_STATUS_INTRANS
+        )
+        pool.checkin(connection)
+        connection.rollback.assert_called_once()
+        self.assertEqual(pool.get_stats()["idle"], 1)
+
+        connection = pool.checkout(self.connect)
+        connection.get_transaction_status.return_value = (
+            extensions.TRANSACTION_STATUS_UNKNOWN
+        )
+        pool.checkin(connection)
+        connection.close.assert_called_once()
+        self.assertEqual(pool.get_stats()["idle"], 0)
+
+    def test_timeout(self):
+        pool = ConnectionPool("default", max_size=1, timeout=0.01)
+        connection = pool.checkout(self.connect)
+        with self.assertRaises(OperationalError):
+            pool.checkout(self.connect)
+        self.assertEqual(pool.get_stats()["timeouts"], 1)
+        pool.checkin(connection)
+        self.assertIs(pool.checkout(self.connect), connection)
+
+    def test_health_check(self):
+        pool = ConnectionPool("default", max_size=1, health_check_interval=0)
+        dropped = pool.checkout(lambda: self.connect(healthy=False))
+        pool.checkin(dropped)
+        connection = pool.checkout(self.connect)
+        self.assertIsNot(connection, dropped)
+        dropped.close.assert_called_once()
+        pool.checkin(connection)
+        self.assertIs(pool.checkout(self.connect), connection)
+        self.assertEqual(pool.get_stats()["discarded"], 1)
+
+    def test_stats_of_concurrent_checkouts(self):
+        pool = ConnectionPool("default", max_size=4)
+
+        def worker(_):
+            for _ in range(200):
+                pool.checkin(pool.checkout(self.connect))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(worker, range(8)))
+        stats = pool.get_stats()
+        self.assertEqual(stats["checkouts"], 1600)
+        self.assertEqual(stats["created"], stats["idle"])
+        self.assertLessEqual(stats["created"], 4)
+
+
+@override_settings(REPORT_HIDE_THRESHOLD=5)
+class ReportModerationTests(JobTestCase):
+    """Reports are aggregated on the job, which is hidden past a threshold."""
+
+    JOB_COUNT = 1
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.job = cls.jobs[0]
+        cls.seekers = [
+            Account.objects.create_user(
+                f"seeker{i}@example.com", "Job", "Seeker", "password", account_type=1
+            )
+            for i in range(3)
+        ]
+
+    def report(self, seeker, reason):
+        Report.objects.create(job=self.job, user=seeker.jobseeker, reason=reason)
+        self.job.refresh_from_db()
+
+    def listed_jobs(self, user):
+        self.client.force_login(user)
+        response = self.client.get(reverse("jobs:job-list"))
+        return list(response.context["jobs"])
+
+    def test_reports_are_aggregated(self):
+        self.report(self.seekers[0], 3)
+        self.report(self.seekers[1], 2)
+        self.assertEqual(self.job.report_count, 2)
+        self.assertEqual(self.job.report_score, 4)
+        self.assertFalse(self.job.is_hidden)
+
+    def test_job_is_hidden_at_threshold(self):
+        self.report(self.seekers[0], 2)
+        self.report(self.seekers[1], 2)
+        self.assertTrue(self.job.is_hidden)
+        self.assertEqual(self.listed_jobs(self.seekers[2]), [])
+
+    def test_reported_job_is_hidden_from_reporter_only(self):
+        self.report(self.seekers[0], 3)
+        self.assertEqual(self.listed_jobs(self.seekers[0]), [])
+        self.assertEqual(self.listed_jobs(self.seekers[1]), [self.job])
+
+    def test_report_invalidates_the_job_only(self):
+        # reports don't change bookmarks, the only values cached per user
+        with mock.patch.object(versioned_cache, "bump") as bump:
+            self.report(self.seekers[0], 3)
+        bump.assert_called_once_with("job", self.job.pk)
+
+    def test_moderation_invalidates_the_job(self):
+        admin = Account.objects.create_superuser(
+            "admin@example.com", "Ad", "Min", "password"
+        )
+        self.report(self.seekers[0], 3)
+        self.client.force_login(admin)
+        url = reverse("admin:jobs_reportedjob_change", args=[self.job.pk])
+        data = {
+            "is_hidden": "on",
+            "reports-TOTAL_FORMS": 1,
+            "reports-INITIAL_FORMS": 1,
+            "reports-0-id": self.job.reports.get().pk,
+            "reports-0-job": self.job.pk,
+        }
+        with mock.patch.object(versioned_cache, "bump") as bump:
+            response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+        self.job.refresh_from_db()
+        self.assertTrue(self.job.is_hidden)
+        bump.assert_called_once_with("job", self.job.pk)
+
+
+class BulkJobActionTests(JobTestCase):
+    """Admin bulk actions update jobs in chunks and send one signal."""
+
+    JOB_COUNT = 5
+    JOB_STATUS = 0
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = Account.objects.create_superuser(
+            "admin@example.com", "Ad", "Min", "password"
+        )
+        cls.design = JobCategory.objects.create(name="Design", slug="design")
+
+    def test_update_jobs_in_chunks(self):
+        received = []
+
+        def listener(sender, job_ids, fields, **kwargs):
+            received.append((sorted(job_ids), fields))
+
+        jobs_bulk_updated.connect(listener)
+        self.addCleanup(jobs_bulk_updated.disconnect, listener)
+        with self.assertNumQueries(1 + 3 * 3):
+            # one SELECT of ids, then SAVEPOINT, UPDATE, RELEASE per chunk
+            updated = bulk.update_jobs(Job.objects.all(), {"status": 1}, chunk_size=2)
+        self.assertEqual(updated, 5)
+        self.assertEqual(Job.objects.filter(status=1).count(), 5)
+        self.assertEqual(
+            received,
+            [(sorted(job.pk for job in self.jobs), ["status", "updated_at"])],
+        )
+
+    def test_recategorize_asks_for_category(self):
+        self.client.force_login(self.admin)
+        url = reverse("admin:jobs_job_changelist")
+        selected = [self.jobs[0].pk, self.jobs[1].pk]
+        data = {"action": "recategorize_jobs", "_selected_action": selected}
+        response = self.client.post(url, data)
+        self.assertTemplateUsed(response, "admin/jobs/job/recategorize.html")
+        self.assertEqual(Job.objects.filter(category=self.design).count(), 0)
+
+        data.update(apply="Move jobs", category=self.design.pk)
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            set(Job.objects.filter(category=self.design).values_list("pk", flat=True)),
+            set(selected),
+        )
+
+
+class SearchTests(JobTestCase):
+    """Jobs are searched by their stored search vector, kept up to date."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = Account.objects.create_superuser(
+            "admin@example.com", "Ad", "Min", "password"
+        )
+
+    def setUp(self):
+        # as left by bulk_create(), which bypasses Job.save()
+        Job.objects.update(search_vector=None)
+        bulk.update_jobs(Job.objects.filter(pk=self.jobs[0].pk), {"title": "Plumber"})
+
+    def test_bulk_update_refreshes_search_vector(self):
+        vectors = dict(Job.objects.values_list("pk", "search_vector"))
+        self.assertIn("plumber", str(vectors[self.jobs[0].pk]).lower())
+        self.assertIsNone(vectors[self.jobs[1].pk])
+
+    def test_imported_jobs_get_summaries_and_search_vectors(self):
+        Job.objects.filter(pk=self.jobs[1].pk).update(summary=None)
+        call_command("generate_job_summaries", stdout=io.StringIO())
+        job = Job.objects.get(pk=self.jobs[1].pk)
+        self.assertEqual(job.summary, "Do things.")
+        self.assertIn("job", str(job.search_vector).lower())
+
+    def test_generated_summaries_are_not_regenerated(self):
+        job = self.jobs[1]
+        Job.objects.filter(pk=job.pk).update(summary=None, description="")
+        updated_at = dict(Job.objects.values_list("pk", "updated_at"))
+        out = io.StringIO()
+        with mock.patch.object(versioned_cache, "bump") as bump:
+            call_command("generate_job_summaries", stdout=out)
+        self.assertIn("Generated summaries for 1 jobs.", out.getvalue())
+        # only the job whose summary changed is invalidated
+        bump.assert_called_once_with("job", job.pk)
+        self.assertEqual(Job.objects.get(pk=job.pk).summary, "")
+        self.assertEqual(dict(Job.objects.values_list("pk", "updated_at")), updated_at)
+
+        out = io.StringIO()
+        call_command("generate_job_summaries", stdout=out)
+        self.assertIn("Generated summaries for 0 jobs.", out.getvalue())
+
+    def test_aggregated_jobs_keep_scraped_summaries(self):
+        job = self.create_job(
+            "Scraped",
+            description=None,
+            source_link="https://example.com/1",
+            summary="Scraped summary.",
+        )
+        job.title = "Scraped, edited"
+        job.save()
+        call_command("generate_job_summaries", "--all", stdout=io.StringIO())
+        populate_summaries = import_module(
+            "jobs.migrations.0006_populate_job_summaries"
+        ).populate_summaries
+        populate_summaries(apps, None)
+        job.refresh_from_db()
+        self.assertEqual(job.summary, "Scraped summary.")
+
+        # without a scraped summary, one is generated from the description
+        job = self.create_job("Scraped", source_link="https://example.com/2")
+        self.assertEqual(job.summary, "Do things.")
+
+    @skipUnless(connection.vendor == "postgresql", "full text search")
+    def test_public_search(self):
+        response = self.client.get(
+            reverse("jobs:job-search"), {"q": "plumber", "l": ""}
+        )
+        self.assertEqual(
+            [job.pk for job in response.context["search_results"]], [self.jobs[0].pk]
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "full text search")
+    def test_admin_search(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(
+            reverse("admin:jobs_job_changelist"), {"q": "plumbers"}
+        )
+        self.assertEqual(
+            [job.pk for job in response.context["cl"].result_list], [self.jobs[0].pk]
+        )
+
+
+class EstimatedCountPaginatorTests(JobTestCase):
+    """Unfiltered large tables are counted from the statistics."""
+
+    JOB_COUNT = 3
+
+    def paginator(self, queryset, estimate):
+        paginator = EstimatedCountPaginator(queryset, 10)
+        patcher = mock.patch.object(paginator, "estimated_count", return_value=estimate)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return paginator
+
+    def test_large_estimate_is_used(self):
+        paginator = self.paginator(Job.objects.all(), ESTIMATE_THRESHOLD + 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.count, ESTIMATE_THRESHOLD + 1)
+
+    def test_small_or_missing_estimate_is_counted(self):
+        for estimate in [ESTIMATE_THRESHOLD - 1, None]:
+            paginator = self.paginator(Job.objects.all(), estimate)
+            self.assertEqual(paginator.count, 3)
+
+    def test_filtered_queryset_is_not_estimated(self):
+        paginator = EstimatedCountPaginator(Job.objects.filter(status=1), 10)
+        with self.assertNumQueries(0):
+            self.assertIsNone(paginator.estimated_count())
+        self.assertEqual(paginator.count, 3)
+
+    @skipUnless(connection.vendor == "postgresql", "table statistics")
+    def test_estimate_from_statistics(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE jobs_job")
+        paginator = EstimatedCountPaginator(Job.objects.all(), 10)
+        self.assertEqual(paginator.estimated_count(), 3)
+
+
+class SimilarJobTests(JobTestCase):
+    """Similar jobs are precomputed in full, or for new posts only."""
+
+    JOB_COUNT = 0
+    POSTS = [
+        ("Python developer", "Build Django APIs in Python."),
+        ("Django engineer", "Python and Django backend services."),
+        ("Accountant", "Prepare ledgers and audits."),
+        ("Nurse", "Care for patients in the ward."),
+        ("Driver", "Deliver goods across town."),
+        ("Chef", "Cook meals in a busy kitchen."),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.jobs = [
+            cls.create_job(title, description=f"<p>{description}</p>")
+            for title, description in cls.POSTS
+        ]
+
+    def neighbours(self, job):
+        return list(
+            SimilarJob.objects.filter(job=job).values_list("similar_id", flat=True)
+        )
+
+    def test_full_build(self):
+        self.assertEqual(similarity.build_index(), len(self.POSTS))
+        python, django = self.jobs[:2]
+        self.assertEqual(self.neighbours(python)[0], django.pk)
+
+        response = self.client.get(python.get_absolute_url())
+        self.assertEqual(response.context["similar_jobs"][0], django)
+
+    def test_incremental_build_loads_new_jobs_only(self):
+        similarity.build_index()
+        new = self.create_job("Python Django developer", description="<p>Django.</p>")
+        original = similarity.load_corpus
+        loaded = []
+
+        def load_corpus(*args, **kwargs):
+            corpus = original(*args, **kwargs)
+            loaded.append(set(corpus))
+            return corpus
+
+        with mock.patch.object(similarity, "load_corpus", load_corpus):
+            refreshed = similarity.build_index(incremental=True)
+        self.assertEqual(loaded, [{new.pk}])
+        self.assertEqual(refreshed, 3)
+        self.assertEqual(set(self.neighbours(new)), {job.pk for job in self.jobs[:2]})
+        self.assertIn(new.pk, self.neighbours(self.jobs[0]))
+        self.assertTrue(JobTerm.objects.filter(job=new).exists())
+
+        # indexed now, so the next run has nothing to do
+        self.assertEqual(similarity.build_index(incremental=True), 0)
+
+    def test_incremental_build_skips_jobs_without_postings(self):
+        similarity.build_index()
+        # no term of the job is in the index, so its vector is empty
+        new = self.create_job("Zookeeper", description="<p>Feed lions.</p>")
+        self.assertEqual(similarity.build_index(incremental=True), 1)
+        self.assertFalse(JobTerm.objects.filter(job=new).exists())
+        with mock.patch.object(similarity, "build_vectors") as build_vectors:
+            self.assertEqual(similarity.build_index(incremental=True), 0)
+        build_vectors.assert_not_called()
+
+        # a full build indexes jobs again once they are listed
+        Job.objects.filter(pk=new.pk).update(status=0)
+        similarity.build_index()
+        Job.objects.filter(pk=new.pk).update(status=1)
+        self.assertEqual(similarity.build_index(incremental=True), 1)
+
+
+class DuplicateJobTests(JobTestCase):
+    """Aggregated posts reposting a live job are marked as duplicates."""
+
+    JOB_COUNT = 0
+    DESCRIPTION = (
+        "<p>Prepare monthly ledgers, reconcile bank statements and support "
+        "the external auditors during the yearly audit.</p>"
+    )
+
+    def post(self, source_link, **fields):
+        fields.setdefault("description", self.DESCRIPTION)
+        return self.create_job("Senior accountant", source_link=source_link, **fields)
+
+    def test_repost_of_live_job(self):
+        original = self.post("https://example.com/1")
+        repost = self.post("https://example.org/1")
+        self.assertEqual(repost.duplicate_of, original)
+        self.assertIsNone(Job.objects.get(pk=original.pk).duplicate_of)
+
+    def test_repost_of_closed_job(self):
+        self.post("https://example.com/1", deadline=datetime.date(2000, 1, 1))
+        self.post("https://example.com/2", is_hidden=True)
+        self.post("https://example.com/3", status=0)
+        self.assertIsNone(self.post("https://example.org/1").duplicate_of)
+
+    def test_signature_fields(self):
+        job = self.post("https://example.com/1")
+        with mock.patch.object(dedup, "register_job") as register_job:
+            job.save(update_fields=["status", "report_count"])
+            register_job.assert_not_called()
+            job.save(update_fields=["description"])
+            register_job.assert_called_once_with(job)
+
+    def test_backfill(self):
+        original = self.post("https://example.com/1")
+        repost = self.post("https://example.org/1")
+        description = "<p>Drive the delivery van across town, loading goods.</p>"
+        expired = self.post(
+            "https://example.com/2",
+            description=description,
+            deadline=datetime.date(2000, 1, 1),
+        )
+        relisted = self.post("https://example.org/2", description=description)
+        direct = self.create_job("Senior accountant", description=self.DESCRIPTION)
+
+        out = io.StringIO()
+        call_command("detect_duplicate_jobs", "--rebuild", stdout=out)
+        self.assertIn("Found 1 duplicate jobs.", out.getvalue())
+        self.assertEqual(
+            set(JobSignature.objects.values_list("job_id", flat=True)),
+            {original.pk, repost.pk, expired.pk, relisted.pk},
+        )
+        self.assertEqual(
+            dict(
+                Job.objects.exclude(duplicate_of=None).values_list("pk", "duplicate_of")
+            ),
+            {repost.pk: original.pk},
+        )
+
+
+class JobFeedTests(JobTestCase):
+    """Feeds rank open jobs by the interests of each job seeker."""
+
+    def test_jobs_without_publication_time(self):
+        # e.g. published by queryset.update(), which doesn't set published_at
+        Job.objects.filter(pk=self.jobs[0].pk).update(published_at=None)
+        jobs = feed.load_jobs()
+        self.assertEqual(set(jobs), {job.pk for job in self.jobs})
+        self.assertEqual(jobs[self.jobs[0].pk][0], self.category.pk)
+
+    def test_ranking(self):
+        seeker = Account.objects.create_user(
+            "seeker@example.com", "Job", "Seeker", "password", account_type=1
+        )
+        bookmarked, software = self.jobs
+        closed = self.create_job("Closed", deadline=datetime.date(2000, 1, 1))
+        health = JobCategory.objects.create(name="Health", slug="health")
+        nurse = self.create_job("Nurse", category=health)
+        self.create_job("Doctor", category=health)
+        Bookmark.objects.create(user=seeker, job=bookmarked)
+        SimilarJob.objects.create(job=bookmarked, similar=nurse, score=0.5)
+
+        self.assertEqual(feed.build_feeds(), 1)
+        # jobs of the bookmarked category first, then its similar jobs
+        job_ids = JobFeed.objects.get(user=seeker).job_ids
+        self.assertEqual(job_ids, [software.pk, nurse.pk])
+        self.assertNotIn(closed.pk, job_ids)
+
+    def test_cursors(self):
+        seeker = Account.objects.create_user(
+            "seeker@example.com", "Job", "Seeker", "password", account_type=1
+        )
+        self.client.force_login(seeker)
+        url = reverse("jobs:job-feed")
+        self.assertRedirects(self.client.get(url), reverse("jobs:job-list"))
+
+        jobs = self.jobs + [self.create_job(f"Job {i}") for i in range(2, 12)]
+        JobFeed.objects.create(user=seeker, job_ids=[job.pk for job in jobs])
+        response = self.client.get(url)
+        self.assertEqual(response.context["jobs"], jobs[:10])
+        self.assertIsNone(response.context["previous_cursor"])
+        self.assertEqual(response.context["next_cursor"], 10)
+
+        Job.objects.filter(pk=jobs[10].pk).update(is_hidden=True)
+        response = self.client.get(url, {"cursor": 10})
+        self.assertEqual(response.context["jobs"], jobs[11:])
+        self.assertEqual(response.context["previous_cursor"], 0)
+        self.assertIsNone(response.context["next_cursor"])
+
+        response = self.client.get(url, {"cursor": "next"})
+        self.assertEqual(response.context["jobs"], jobs[:10])
+
+
+class JobTimestampTests(JobTestCase):
+    """Jobs are listed by first publication; edits don't reorder them."""
+
+    JOB_COUNT = 0
+
+    def test_published_at_is_set_once(self):
+        job = self.create_job("Draft", 0)
+        self.assertIsNone(job.published_at)
+        job.status = 1
+        job.save(update_fields=["status"])
+        job.refresh_from_db()
+        published_at = job.published_at
+        self.assertIsNotNone(published_at)
+
+        job.status = 0
+        job.save()
+        job.status = 1
+        job.save()
+        job.refresh_from_db()
+        self.assertEqual(job.published_at, published_at)
+        self.assertGreater(job.updated_at, published_at)
+
+    def test_edits_keep_listing_order(self):
+        older = self.create_job("Older", 1)
+        newer = self.create_job("Newer", 1)
+        self.assertEqual(list(Job.objects.all()), [newer, older])
+        older.title = "Older, edited"
+        older.save()
+        self.assertEqual(list(Job.objects.all()), [newer, older])
+
+
+class SitemapTests(JobTestCase):
+    """Sitemaps are sharded by id and only changed shards are rewritten."""
+
+    JOB_COUNT = 3
+
+    def setUp(self):
+        settings = override_settings(SITE_URL="https://jobs.example.com")
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # one shard per id
+        size = mock.patch.object(sitemaps, "SITEMAP_SIZE", 1)
+        size.start()
+        self.addCleanup(size.stop)
+
+    def read_shard(self, job):
+        shard = Sitemap.objects.get(name=sitemaps.shard_name(job.pk))
+        return gzip.decompress(shard.content).decode()
+
+    def test_build_is_incremental(self):
+        self.assertEqual(sitemaps.build_sitemaps(), 3)
+        self.assertIn(
+            f"<loc>https://jobs.example.com/jobs/{self.jobs[0].slug}/</loc>",
+            self.read_shard(self.jobs[0]),
+        )
+        self.assertEqual(sitemaps.build_sitemaps(), 0)
+
+        self.jobs[1].title = "Job 1, edited"
+        self.jobs[1].save()
+        self.assertEqual(sitemaps.build_sitemaps(), 1)
+
+        Job.objects.filter(pk=self.jobs[2].pk).update(is_hidden=True)
+        self.assertEqual(sitemaps.build_sitemaps(), 0)
+        self.assertFalse(
+            Sitemap.objects.filter(name=sitemaps.shard_name(self.jobs[2].pk)).exists()
+        )
+        self.assertEqual(sitemaps.build_sitemaps(full=True), 2)
+        # the site moved: every shard has new URLs
+        self.assertEqual(sitemaps.build_sitemaps("https://example.org"), 2)
+        self.assertIn("https://example.org/jobs/", self.read_shard(self.jobs[0]))
+
+    def test_sitemaps_are_served(self):
+        self.assertEqual(self.client.get("/sitemap.xml").status_code, 404)
+        sitemaps.build_sitemaps()
+        index = self.client.get("/sitemap.xml")
+        self.assertEqual(index["Content-Type"], "application/xml")
+        shard_url = reverse(
+            "jobs:sitemap", kwargs={"name": sitemaps.shard_name(self.jobs[0].pk)}
+        )
+        self.assertIn(shard_url, index.content.decode())
+        shard = self.client.get(shard_url)
+        self.assertEqual(shard["Content-Type"], "application/gzip")
+        self.assertIn(self.jobs[0].slug, gzip.decompress(shard.content).decode())
+        response = self.client.get(
+            "/sitemap.xml", HTTP_IF_MODIFIED_SINCE=index["Last-Modified"]
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertIn(
+            "Sitemap: http://testserver/sitemap.xml",
+            self.client.get("/robots.txt").content.decode(),
+        )
+
+    def test_feeds(self):
+        for name in ["jobs:jobs-rss", "jobs:jobs-atom"]:
+            response = self.client.get(reverse(name))
+            self.assertContains(response, self.jobs[0].title)
+        response = self.client.get(
+            reverse("jobs:category-rss", kwargs={"slug": "software"})
+        )
+        self.assertContains(response, "Latest Software jobs")
+
+
+class ApplicationStatusTests(JobTestCase):
+    """Employers move the applications to their jobs between lists."""
+
+    JOB_COUNT = 1
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        seeker = Account.objects.create_user(
+            "seeker@example.com", "Job", "Seeker", "password"
+        )
+        cls.application = JobApplication.objects.create(
+            job=cls.jobs[0], jobseeker=seeker.jobseeker, resume="resumes/seeker.pdf"
+        )
+
+    def move(self, name):
+        return self.client.post(reverse(name), {"ap_id": self.application.pk})
+
+    def status(self):
+        self.application.refresh_from_db()
+        return self.application.status
+
+    def test_move_and_move_back(self):
+        self.client.force_login(self.account)
+        for name, status in [
+            ("jobs:ap-shortlist", 1),
+            ("jobs:ap-contact", 2),
+            ("jobs:ap-archive", 3),
+        ]:
+            response = self.move(name)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), {"ap_id": str(self.application.pk)})
+            self.assertEqual(self.status(), status)
+            # posting again moves it back to pending
+            self.move(name)
+            self.assertEqual(self.status(), 0)
+
+    def test_applications_of_other_employers(self):
+        other = Account.objects.create_user(
+            "other@example.com", "Ot", "Her", "password", account_type=2
+        )
+        self.client.force_login(other)
+        self.assertEqual(self.move("jobs:ap-shortlist").status_code, 404)
+        self.assertEqual(self.status(), 0)
+
+    def test_post_only_and_login_required(self):
+        self.assertEqual(self.move("jobs:ap-shortlist").status_code, 401)
+        self.client.force_login(self.account)
+        response = self.client.get(reverse("jobs:ap-shortlist"))
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(self.status(), 0)
+
+
+class ApplicantExportTests(JobTestCase):
+    """Employers download the applicants of their jobs as CSV."""
+
+    JOB_COUNT = 1
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.job = cls.jobs[0]
+        for i, first_name in enumerate(["Abebe", "=HYPERLINK()", "Kebede"]):
+            seeker = Account.objects.create_user(
+                f"seeker{i}@example.com", first_name, "Seeker", "password"
+            )
+            JobApplication.objects.create(
+                job=cls.job,
+                jobseeker=seeker.jobseeker,
+                resume=f"resumes/seeker{i}.pdf",
+                status=1 if i else 0,
+            )
+
+    def export(self, query=""):
+        url = reverse("jobs:job-applicants-export", kwargs={"slug": self.job.slug})
+        response = self.client.get(url + query)
+        content = b"".join(response.streaming_content).decode("utf-8-sig")
+        return response, list(csv.reader(io.StringIO(content)))
+
+    def test_export(self):
+        self.client.force_login(self.account)
+        response, rows = self.export()
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(rows[0][:3], ["First name", "Last name", "Email"])
+        self.assertEqual(
+            [row[0] for row in rows[1:]], ["Abebe", "'=HYPERLINK()", "Kebede"]
+        )
+        self.assertEqual(rows[1][5], "http://testserver/media/resumes/seeker0.pdf")
+
+        _, rows = self.export("?status=1")
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row[3] for row in rows[1:]}, {"Short Listed"})
+
+    def test_resumes_zip(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        for i in range(2):
+            path = Path(media.name) / "resumes" / f"seeker{i}.pdf"
+            path.parent.mkdir(exist_ok=True)
+            path.write_bytes(b"%PDF resume " * 10000 * (i + 1))
+
+        self.client.force_login(self.account)
+        url = reverse("jobs:job-applicants-resumes", kwargs={"slug": self.job.slug})
+        with override_settings(MEDIA_ROOT=media.name):
+            response = self.client.get(url)
+            content = b"".join(response.streaming_content)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        archive = zipfile.ZipFile(io.BytesIO(content))
+        self.assertIsNone(archive.testzip())
+        names = archive.namelist()
+        self.assertEqual(len(names), 3)
+        self.assertTrue(names[0].startswith("Abebe_Seeker_"))
+        self.assertEqual(len(archive.read(names[1])), 12 * 20000)
+        self.assertEqual(archive.read("missing.txt"), b"Kebede Seeker\n")
+
+    def test_other_employers_get_404(self):
+        other = Account.objects.create_user(
+            "other@example.com", "Ot", "Her", "password", account_type=2
+        )
+        self.client.force_login(other)
+        url = reverse("jobs:job-applicants-export", kwargs={"slug": self.job.slug})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class AssetBundleTests(SimpleTestCase):
+    """Templates load a bundle, or its sources in development."""
+
+    BUNDLES = {"jobs.js": ["accounts/js/app.js", "js/alert-removal.js"]}
+
+    def render(self):
+        return Template('{% load assets %}{% asset_bundle "jobs.js" %}').render(
+            Context()
+        )
+
+    def test_sources_in_development(self):
+        with self.settings(ASSET_BUNDLES=self.BUNDLES, ASSETS_BUNDLED=False):
+            self.assertHTMLEqual(
+                self.render(),
+                '<script src="/static/accounts/js/app.js"></script>'
+                '<script src="/static/js/alert-removal.js"></script>',
+            )
+
+    def test_bundle(self):
+        with self.settings(ASSET_BUNDLES=self.BUNDLES, ASSETS_BUNDLED=True):
+            self.assertHTMLEqual(
+                self.render(), '<script src="/static/bundles/jobs.js"></script>'
+            )
+
+    def test_build_bundle(self):
+        bundle = assets.build_bundle(
+            "site.js", [("a.js", "// a\nvar a = 1\n"), ("b.js", "var b = 2;")]
+        )
+        self.assertEqual(bundle, "var a=1;\nvar b=2;")
+
+
+class JobCardTests(JobTestCase):
+    """Job cards are rendered once per version and bookmarks overlaid per user."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cards_are_rendered_once(self):
+        with mock.patch.object(
+            cards, "render_card", wraps=cards.render_card
+        ) as render_card:
+            cards.render_cards(self.jobs)
+            html = cards.render_cards(self.jobs, {self.jobs[1].pk})
+        self.assertEqual(render_card.call_count, 2)
+        self.assertEqual(html.count("Unsave"), 1)
+        self.assertEqual(html.count("</i>Save"), 1)
+        self.assertNotIn(cards.BOOKMARK_PLACEHOLDER, html)
+
+    def test_saving_a_job_renders_its_card_again(self):
+        cards.render_cards(self.jobs)
+        job = self.jobs[0]
+        job.title = "Renamed"
+        job.save()
+        self.assertIn("Renamed", cards.render_cards([job]))
+
+    def test_cards_without_actions(self):
+        html = cards.render_cards(self.jobs, actions=False)
+        self.assertIn("Job 0", html)
+        self.assertNotIn("bookmark", html)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class VersionedCacheTests(JobTestCase):
+    """Cached values are invalidated by bumping the versions in their keys."""
+
+    def setUp(self):
+        cache.clear()
+        # the local memory cache stands in for a shared one
+        shared = mock.patch.object(versioned_cache, "is_shared", return_value=True)
+        shared.start()
+        self.addCleanup(shared.stop)
+
+    def keys(self):
+        return [
+            versioned_cache.make_key("test", [("job", job.pk)]) for job in self.jobs
+        ]
+
+    def test_bump_entity(self):
+        first, second = self.keys()
+        versioned_cache.bump("job", self.jobs[0].pk)
+        new_first, new_second = self.keys()
+        self.assertNotEqual(new_first, first)
+        self.assertEqual(new_second, second)
+
+    def test_bump_namespace(self):
+        before = self.keys()
+        versioned_cache.bump("job")
+        self.assertFalse(set(before) & set(self.keys()))
+
+    def test_evicted_version_is_not_reused(self):
+        before = self.keys()[0]
+        cache.clear()
+        self.assertNotEqual(self.keys()[0], before)
+
+    def test_bulk_update_bumps_jobs(self):
+        before = self.keys()
+        bulk.update_jobs(Job.objects.filter(pk=self.jobs[0].pk), {"status": 0})
+        after = self.keys()
+        self.assertNotEqual(after[0], before[0])
+        self.assertEqual(after[1], before[1])
+
+    def test_employer_change_renders_cards_again(self):
+        jobs = list(Job.objects.select_related("employer"))
+        cards.render_cards(jobs)
+        self.employer.company_name = "Renamed Inc."
+        self.employer.save()
+        jobs = list(Job.objects.select_related("employer"))
+        self.assertEqual(cards.render_cards(jobs).count("Renamed Inc."), 2)
+        self.assertEqual(versioned_cache.stats("job_card"), {"hits": 0, "misses": 4})
+        cards.render_cards(jobs)
+        self.assertEqual(versioned_cache.stats("job_card")["hits"], 2)
+
+    def test_saved_job_ids_follow_bookmarks(self):
+        seeker = Account.objects.create_user(
+            "seeker@example.com", "Job", "Seeker", "password", account_type=1
+        )
+        self.assertEqual(views.get_saved_job_ids(seeker), set())
+        self.client.force_login(seeker)
+        response = self.client.post(
+            reverse("accounts:bookmark-sync"),
+            {"save": [self.jobs[0].pk]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(views.get_saved_job_ids(seeker), {self.jobs[0].pk})
+        self.assertEqual(
+            versioned_cache.stats("saved_job_ids"), {"hits": 0, "misses": 2}
+        )
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "worker1": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "worker1",
+        },
+        "worker2": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "worker2",
+        },
+    }
+)
+class UnsharedCacheTests(JobTestCase):
+    """Workers with caches of their own don't serve each other's stale values."""
+
+    def on_worker(self, alias):
+        return override_settings(VERSIONED_CACHE=alias)
+
+    def test_cards_follow_the_database(self):
+        with self.on_worker("worker1"):
+            self.assertFalse(versioned_cache.is_shared())
+            cards.render_cards(self.jobs)
+        with self.on_worker("worker2"):
+            job = Job.objects.get(pk=self.jobs[0].pk)
+            job.title = "Renamed"
+            job.save()
+        with self.on_worker("worker1"):
+            jobs = list(Job.objects.select_related("employer"))
+            self.assertIn("Renamed", cards.render_cards(jobs))
+
+    def test_saved_job_ids_are_not_cached(self):
+        seeker = Account.objects.create_user(
+            "seeker@example.com", "Job", "Seeker", "password", account_type=1
+        )
+        with self.on_worker("worker1"):
+            self.assertEqual(views.get_saved_job_ids(seeker), set())
+        with self.on_worker("worker2"):
+            self.client.force_login(seeker)
+            self.client.post(
+                reverse("accounts:bookmark-sync"),
+                {"save": [self.jobs[0].pk]},
+                content_type="application/json",
+            )
+        with self.on_worker("worker1"):
+            self.assertEqual(views.get_saved_job_ids(seeker), {self.jobs[0].pk})
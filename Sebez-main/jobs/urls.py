@@ -1,6 +1,6 @@
-from django.urls import path
+from django.urls import path, re_path
 
-from . import views
+from . import syndication, views
 
 app_name = "jobs"
 
@@ -8,9 +8,10 @@ urlpatterns = [
     path("", views.LandingPage.as_view(), name="home"),
     path("search", views.SearchResultsList.as_view(), name="job-search"),
     path("jobs/", views.JobList.as_view(), name="job-list"),
-    path("contact/", views.ContactApplication.as_view(), name="ap-contact"),
-    path("shortlist/", views.ShortListApplication.as_view(), name="ap-shortlist"),
-    path("archive/", views.ArchiveApplication.as_view(), name="ap-archive"),
+    path("feed/", views.JobFeedView.as_view(), name="job-feed"),
+    path("contact/", views.contact_application, name="ap-contact"),
+    path("shortlist/", views.shortlist_application, name="ap-shortlist"),
+    path("archive/", views.archive_application, name="ap-archive"),
     path("resume/", views.ResumeBuilder.as_view(), name="resume-builder"),
     path("em/", views.EmployerHomePage.as_view(), name="employer-home"),
     path("em/my-jobs/", views.EmployerMyJobs.as_view(), name="employer-myjobs"),
@@ -21,6 +22,16 @@ urlpatterns = [
         views.ApplicantManager.as_view(),
         name="job-applicants",
     ),
+    path(
+        "em/jobs/<slug:slug>/applicants/export/",
+        views.ApplicantExport.as_view(),
+        name="job-applicants-export",
+    ),
+    path(
+        "em/jobs/<slug:slug>/applicants/resumes/",
+        views.ApplicantResumes.as_view(),
+        name="job-applicants-resumes",
+    ),
     path(
         "jobs/<slug:slug>/applicants/<str:uid>/",
         views.ApplicantDetail.as_view(),
@@ -34,4 +45,23 @@ urlpatterns = [
     ),
     path("jobs/<slug:slug>/reports/", views.ReportJob.as_view(), name="report"),
     path("category/<slug:slug>/", views.JobCategoryView.as_view(), name="job-category"),
+    path("rss/jobs/", syndication.LatestJobsFeed(), name="jobs-rss"),
+    path("atom/jobs/", syndication.LatestJobsAtomFeed(), name="jobs-atom"),
+    path(
+        "rss/category/<slug:slug>/",
+        syndication.CategoryJobsFeed(),
+        name="category-rss",
+    ),
+    path(
+        "atom/category/<slug:slug>/",
+        syndication.CategoryJobsAtomFeed(),
+        name="category-atom",
+    ),
+    path("sitemap.xml", views.sitemap, name="sitemap-index"),
+    re_path(
+        r"^sitemaps/(?P<name>sitemap-[a-z0-9-]+\.xml\.gz)$",
+        views.sitemap,
+        name="sitemap",
+    ),
+    path("robots.txt", views.robots_txt, name="robots-txt"),
 ]
@@ -1,9 +1,10 @@
 from imp import source_from_cache
 from re import template
 from urllib import request
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.contrib.postgres.search import SearchQuery, SearchRank
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.views.generic import (
     CreateView,
@@ -13,27 +14,78 @@ from django.views.generic import (
     DeleteView,
     View,
 )
-from django.http import JsonResponse
-from django.shortcuts import render, redirect
+from django.db.models import F
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseNotAllowed,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.shortcuts import get_object_or_404, render, redirect
 from django.urls import reverse, reverse_lazy
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from accounts.models import Bookmark, JobSeeker
+from common import cache, utils
+from common.ratelimit import ratelimit
+
+from . import exports, sitemaps
+from .models import (
+    Job,
+    JobApplication,
+    JobCategory,
+    JobFeed,
+    JobFilter,
+    Report,
+    SimilarJob,
+    Sitemap,
+    exclude_reported,
+)
+
+# saved job ids are cached until the user's bookmarks change
+SAVED_JOBS_TIMEOUT = 60 * 60
+
 
-from accounts.models import Employer, JobSeeker, Account
+def get_saved_job_ids(user):
+    """
+    Return the ids of the jobs the user has saved. They are cached only in
+    a shared cache, where a bookmark on one worker reaches the others.
+    """
+    if not user.is_authenticated:
+        return set()
 
-from .models import Job, JobApplication, JobCategory, JobFilter, Report
+    def load():
+        return set(Bookmark.objects.filter(user=user).values_list("job_id", flat=True))
+
+    if not cache.is_shared():
+        return load()
+    return cache.get_or_set(
+        "saved_job_ids",
+        cache.make_key("saved_job_ids", [("user", user.pk)]),
+        load,
+        SAVED_JOBS_TIMEOUT,
+    )
 
 
 class LandingPage(View):
     """Show landing page of the website"""
 
+    use_read_replica = True
+
     def get(self, request):
         if request.user.is_authenticated:
             # TODO: redirect to different pages based on account type
             if request.user.account_type == 2:
                 return redirect(to=reverse("jobs:employer-home"))
             else:
-                return redirect(to=reverse("jobs:job-list"))
+                return redirect(to=reverse("jobs:job-feed"))
 
-        latest_jobs = Job.objects.all()[:10]
+        latest_jobs = Job.objects.filter(duplicate_of=None, is_hidden=False).defer(
+            "description"
+        )[:10]
         popular_categories = JobCategory.objects.all()[:6]
         return render(
             request,
@@ -62,45 +114,85 @@ class JobDetail(DetailView):
             application.jobseeker.user
             for application in JobApplication.objects.filter(job=job)
         ]
+        similar_jobs = [
+            neighbour.similar
+            for neighbour in SimilarJob.objects.filter(
+                job=job, similar__status=1, similar__is_hidden=False
+            )
+            .select_related("similar__employer")
+            .defer("similar__description")
+        ]
         context["job"] = job
         context["applicants"] = applicants
+        context["similar_jobs"] = similar_jobs
         return context
 
 
 class JobList(ListView):
     """Show the list of jobs."""
 
+    use_read_replica = True
+
     template_name = "jobs/job_list.html"
     context_object_name = "jobs"
     paginate_by = 10
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        saved_jobs = []
-        reported_jobs = []
-        if self.request.user.pk is not None:
-            user = Account.objects.get(id=self.request.user.pk)
-            jobseeker = JobSeeker.objects.get(user=user)
-            saved_jobs = [b.job for b in user.bookmark_set.all()]
-            reported_jobs = [r.job for r in jobseeker.reports.all()]
-
         queryset = self.get_queryset()
         filter = JobFilter(self.request.GET, queryset=queryset)
         context["filter"] = filter
-        context["saved_jobs"] = saved_jobs
-        context["reported_jobs"] = reported_jobs
+        context["saved_job_ids"] = get_saved_job_ids(self.request.user)
         return context
 
     def get_queryset(self):
         all_jobs = (
             Job.objects.select_related("category")
             .select_related("employer")
-            .filter(status=1)
+            .filter(status=1, duplicate_of=None, is_hidden=False)
+            .defer("description")
         )
+        all_jobs = exclude_reported(all_jobs, self.request.user)
         filter = JobFilter(self.request.GET, queryset=all_jobs)
         return filter.qs
 
 
+class JobFeedView(LoginRequiredMixin, View):
+    """Show the personalized job feed of a job seeker."""
+
+    paginate_by = 10
+
+    def get(self, request):
+        job_ids = (
+            JobFeed.objects.filter(user=request.user)
+            .values_list("job_ids", flat=True)
+            .first()
+        )
+        if not job_ids:
+            # no bookmarks or applications yet to learn from
+            return redirect(to=reverse("jobs:job-list"))
+
+        try:
+            cursor = max(int(request.GET.get("cursor", 0)), 0)
+        except ValueError:
+            cursor = 0
+        page_ids = job_ids[cursor : cursor + self.paginate_by]
+        jobs = (
+            Job.objects.filter(status=1, is_hidden=False)
+            .select_related("employer")
+            .defer("description")
+            .in_bulk(page_ids)
+        )
+        next_cursor = cursor + self.paginate_by
+        context = {
+            # keep the ranking of the feed
+            "jobs": [jobs[pk] for pk in page_ids if pk in jobs],
+            "previous_cursor": max(cursor - self.paginate_by, 0) if cursor else None,
+            "next_cursor": next_cursor if next_cursor < len(job_ids) else None,
+        }
+        return render(request, "jobs/job_feed.html", context)
+
+
 class JobCreate(LoginRequiredMixin, UserPassesTestMixin, CreateView):
     """Display job creation form and handle the process."""
 
@@ -119,8 +211,7 @@ class JobCreate(LoginRequiredMixin, UserPassesTestMixin, CreateView):
 
     def form_valid(self, form):
         # assign the current logged in user as author of the post
-        employer = Employer.objects.get(user=self.request.user)
-        form.instance.employer = employer
+        form.instance.employer = self.request.user.employer_profile
         if form.instance.status == 0:
             msg = "Your post has been saved as draft."
         elif form.instance.status == 1:
@@ -150,8 +241,7 @@ class JobUpdate(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
 
     def form_valid(self, form):
         # assign the current logged in user as author of the post
-        employer = Employer.objects.get(user=self.request.user)
-        form.instance.employer = employer
+        form.instance.employer = self.request.user.employer_profile
         if form.instance.status == 0:
             msg = "Your post has been saved as draft."
         elif form.instance.status == 1:
@@ -161,8 +251,8 @@ class JobUpdate(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
 
     def test_func(self):
         # check that the person trying to update the job is the  owner
-        employer = Employer.objects.get(user=self.request.user)
-        return self.get_object().employer == employer
+        employer = self.request.user.employer_profile
+        return self.get_object().employer_id == employer.pk
 
 
 class JobDelete(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
@@ -178,8 +268,8 @@ class JobDelete(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
 
     def test_func(self):
         # check that the person trying to delete the job is the  owner
-        employer = Employer.objects.get(user=self.request.user)
-        return self.get_object().employer == employer
+        employer = self.request.user.employer_profile
+        return self.get_object().employer_id == employer.pk
 
 
 class EmployerHomePage(LoginRequiredMixin, UserPassesTestMixin, ListView):
@@ -190,11 +280,10 @@ class EmployerHomePage(LoginRequiredMixin, UserPassesTestMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        employer = Employer.objects.get(user=self.request.user)
-        published_jobs = Job.objects.filter(
-            employer=employer, status=1, source_link=None
-        )
-        draft_jobs = Job.objects.filter(employer=employer, status=0)
+        employer = self.request.user.employer_profile
+        jobs = Job.objects.filter(employer=employer).defer("description")
+        published_jobs = jobs.filter(status=1, source_link=None)
+        draft_jobs = jobs.filter(status=0)
         context["published_jobs"] = published_jobs
         context["draft_jobs"] = draft_jobs
         return context
@@ -211,8 +300,10 @@ class EmployerMyJobs(LoginRequiredMixin, UserPassesTestMixin, ListView):
     template_name = "jobs/employer_myjobs.html"
 
     def get_queryset(self):
-        employer = Employer.objects.get(user=self.request.user)
-        return Job.objects.filter(employer=employer, status=1, source_link=None)
+        employer = self.request.user.employer_profile
+        return Job.objects.filter(employer=employer, status=1, source_link=None).defer(
+            "description"
+        )
 
     def test_func(self):
         return self.request.user.account_type == 2
@@ -226,8 +317,10 @@ class EmployerMyDrafts(LoginRequiredMixin, UserPassesTestMixin, ListView):
     template_name = "jobs/employer_mydrafts.html"
 
     def get_queryset(self):
-        employer = Employer.objects.get(user=self.request.user)
-        return Job.objects.filter(employer=employer, status=0, source_link=None)
+        employer = self.request.user.employer_profile
+        return Job.objects.filter(employer=employer, status=0, source_link=None).defer(
+            "description"
+        )
 
     def test_func(self):
         return self.request.user.account_type == 2
@@ -258,6 +351,41 @@ class ApplicantManager(LoginRequiredMixin, UserPassesTestMixin, ListView):
         return self.request.user.account_type == 2
 
 
+class ApplicantExport(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Stream the applicants of one of the employer's jobs as a CSV file."""
+
+    def get(self, request, slug):
+        job = get_object_or_404(Job, slug=slug, employer=request.user.employer_profile)
+        status = exports.parse_status(request.GET.get("status"))
+        rows = exports.applicant_rows(job, request.build_absolute_uri, status)
+        response = StreamingHttpResponse(
+            exports.csv_lines(rows), content_type="text/csv; charset=utf-8"
+        )
+        filename = f"{job.slug}-applicants.csv"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    def test_func(self):
+        return self.request.user.account_type == 2
+
+
+class ApplicantResumes(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Stream the resumes of the applicants of an employer's job as a ZIP file."""
+
+    def get(self, request, slug):
+        job = get_object_or_404(Job, slug=slug, employer=request.user.employer_profile)
+        status = exports.parse_status(request.GET.get("status"))
+        response = StreamingHttpResponse(
+            exports.resume_zip(job, status), content_type="application/zip"
+        )
+        filename = f"{job.slug}-resumes.zip"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    def test_func(self):
+        return self.request.user.account_type == 2
+
+
 class ApplicantDetail(LoginRequiredMixin, UserPassesTestMixin, DetailView):
     """Show detail of a job application."""
 
@@ -268,7 +396,9 @@ class ApplicantDetail(LoginRequiredMixin, UserPassesTestMixin, DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         job = Job.objects.get(slug=self.kwargs["slug"])
-        jobseeker = JobSeeker.objects.get(user__uid=self.kwargs["uid"])
+        jobseeker = JobSeeker.objects.select_related("user").get(
+            user__uid=self.kwargs["uid"]
+        )
         first_name = jobseeker.user.first_name
         last_name = jobseeker.user.last_name
         application = JobApplication.objects.get(job=job, jobseeker=jobseeker)
@@ -292,8 +422,7 @@ class SubmitApplication(LoginRequiredMixin, UserPassesTestMixin, CreateView):
         job = Job.objects.get(slug=self.kwargs["slug"])
         form.instance.job = job
         # assign the current logged in user as applicant
-        jobseeker = JobSeeker.objects.get(user=self.request.user)
-        form.instance.jobseeker = jobseeker
+        form.instance.jobseeker = self.request.user.jobseeker
         messages.success(self.request, "Your applicant has been submitted!")
         return super().form_valid(form)
 
@@ -301,8 +430,7 @@ class SubmitApplication(LoginRequiredMixin, UserPassesTestMixin, CreateView):
 
     def get_success_url(self):
         # After deleting the job, redirect to employer home page
-        jobseeker = JobSeeker.objects.get(user=self.request.user)
-        return reverse_lazy("accounts:js-proposals", args=(jobseeker.user.uid,))
+        return reverse_lazy("accounts:js-proposals", args=(self.request.user.uid,))
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -317,6 +445,8 @@ class SubmitApplication(LoginRequiredMixin, UserPassesTestMixin, CreateView):
 class SearchResultsList(ListView):
     """Show the list of search results."""
 
+    use_read_replica = True
+
     model = Job
     context_object_name = "search_results"
     template_name = "jobs/search_result.html"
@@ -326,17 +456,18 @@ class SearchResultsList(ListView):
         self.query = self.request.GET["q"]
         self.location = self.request.GET["l"]
 
-        search_vector = SearchVector("title", "description", "location")
         search_query = SearchQuery(f"{self.query} {self.location}")
         self.search_results = (
-            Job.objects.annotate(
-                search=search_vector, rank=SearchRank(search_vector, search_query)
+            Job.objects.filter(
+                search_vector=search_query, duplicate_of=None, is_hidden=False
             )
-            .filter(search=search_query)
+            .annotate(rank=SearchRank(F("search_vector"), search_query))
+            .select_related("employer")
+            .defer("description")
             .order_by("-rank")
         )
-        self.total = len(self.search_results)
         paginator = Paginator(self.search_results, 10)  # 10 jobs per page
+        self.total = paginator.count
         page = self.request.GET.get("page", 1)
         try:
             self.search_results = paginator.page(page)
@@ -357,6 +488,8 @@ class SearchResultsList(ListView):
 class JobCategoryView(ListView):
     """Show all post in a certain category."""
 
+    use_read_replica = True
+
     model = Job
     template_name = "jobs/category.html"
     context_object_name = "category_jobs"
@@ -367,30 +500,28 @@ class JobCategoryView(ListView):
         all_jobs = (
             Job.objects.select_related("category")
             .select_related("employer")
-            .filter(category__slug=self.kwargs.get("slug"))
+            .filter(
+                category__slug=self.kwargs.get("slug"),
+                duplicate_of=None,
+                is_hidden=False,
+            )
+            .defer("description")
         )
+        all_jobs = exclude_reported(all_jobs, self.request.user)
         filter = JobFilter(self.request.GET, queryset=all_jobs)
         return filter.qs
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        saved_jobs = []
-        reported_jobs = []
-        if self.request.user.pk is not None:
-            user = Account.objects.get(id=self.request.user.pk)
-            jobseeker = JobSeeker.objects.get(user=user)
-            saved_jobs = [b.job for b in user.bookmark_set.all()]
-            reported_jobs = [r.job for r in jobseeker.reports.all()]
-
         queryset = self.get_queryset()
         filter = JobFilter(self.request.GET, queryset=queryset)
         context["filter"] = filter
-        context["saved_jobs"] = saved_jobs
-        context["reported_jobs"] = reported_jobs
+        context["saved_job_ids"] = get_saved_job_ids(self.request.user)
         context["total"] = len(queryset)
         return context
 
 
+@method_decorator(ratelimit("report", keys=("ip", "user")), name="dispatch")
 class ReportJob(LoginRequiredMixin, UserPassesTestMixin, CreateView):
     """Handle job reporting using ajax calls."""
 
@@ -401,8 +532,7 @@ class ReportJob(LoginRequiredMixin, UserPassesTestMixin, CreateView):
     def form_valid(self, form):
         # assign user and job for the report
         job = Job.objects.get(slug=self.kwargs["slug"])
-        jobseeker = JobSeeker.objects.get(user=self.request.user)
-        form.instance.user = jobseeker
+        form.instance.user = self.request.user.jobseeker
         form.instance.job = job
         return super().form_valid(form)
 
@@ -420,79 +550,59 @@ class ReportJob(LoginRequiredMixin, UserPassesTestMixin, CreateView):
         return context
 
 
-class ShortListApplication(View):
-    """Handle short listing application using ajax calls."""
+@sync_to_async
+def set_application_status(user, ap_id, status):
+    """
+    Move a pending application of one of the user's jobs to status, or
+    move it back to pending. Return the new status, or None if there is
+    no such application.
+    """
+    applications = JobApplication.objects.filter(id=ap_id, job__employer__user=user)
+    if applications.filter(status=0).update(status=status):
+        return status
+    if applications.update(status=0):
+        return 0
+    return None
+
+
+async def toggle_application_status(request, status, message):
+    """Handle moving an application between lists using ajax calls."""
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    user = await utils.aget_user(request)
+    if user.is_authenticated:
+        ap_id = request.POST.get("ap_id")
+        new_status = await set_application_status(user, ap_id, status)
+        if new_status is None:
+            return JsonResponse({"ap_id": ap_id}, status=404)
+        if new_status == status:
+            messages.info(request, message)
+        return JsonResponse({"ap_id": ap_id}, status=200)
+    else:
+        # Not authenticated
+        messages.warning(
+            request,
+            "Login to your account to perform this action",
+        )
+        return JsonResponse({"is_contacted": False}, status=401)
 
-    def post(self, request):
-        user = self.request.user
-        if user.is_authenticated:
-            # bookmark selected job
-            ap_id = request.POST.get("ap_id")
-            application = JobApplication.objects.get(id=ap_id)
-            if application.status == 0:
-                application.status = 1
-                messages.info(self.request, "Application short listed")
-            else:
-                application.status = 0
-            application.save()
-            return JsonResponse({"ap_id": ap_id}, status=200)
-        else:
-            # Not authenticated
-            messages.warning(
-                self.request,
-                "Login to your account to perform this action",
-            )
-            return JsonResponse({"is_contacted": False}, status=401)
 
+async def shortlist_application(request):
+    """Handle short listing application using ajax calls."""
+    return await toggle_application_status(request, 1, "Application short listed")
 
-class ContactApplication(View):
-    """Handle contact application using ajax calls."""
 
-    def post(self, request):
-        user = self.request.user
-        if user.is_authenticated:
-            # bookmark selected job
-            ap_id = request.POST.get("ap_id")
-            application = JobApplication.objects.get(id=ap_id)
-            if application.status == 0:
-                application.status = 2
-                messages.info(self.request, "Application moved to contacted list")
-            else:
-                application.status = 0
-            application.save()
-            return JsonResponse({"ap_id": ap_id}, status=200)
-        else:
-            # Not authenticated
-            messages.warning(
-                self.request,
-                "Login to your account to perform this action",
-            )
-            return JsonResponse({"is_contacted": False}, status=401)
+async def contact_application(request):
+    """Handle contact application using ajax calls."""
+    return await toggle_application_status(
+        request, 2, "Application moved to contacted list"
+    )
 
 
-class ArchiveApplication(View):
+async def archive_application(request):
     """Handle archiving application using ajax calls."""
-
-    def post(self, request):
-        user = self.request.user
-        if user.is_authenticated:
-            # bookmark selected job
-            ap_id = request.POST.get("ap_id")
-            application = JobApplication.objects.get(id=ap_id)
-            if application.status == 0:
-                application.status = 3
-                messages.info(self.request, "Application archived")
-            else:
-                application.status = 0
-            application.save()
-            return JsonResponse({"ap_id": ap_id}, status=200)
-        else:
-            # Not authenticated
-            messages.warning(
-                self.request,
-                "Login to your account to perform this action",
-            )
-            return JsonResponse({"is_contacted": False}, status=401)
+    return await toggle_application_status(request, 3, "Application archived")
 
 
 class ResumeBuilder(LoginRequiredMixin, View):
@@ -500,3 +610,27 @@ class ResumeBuilder(LoginRequiredMixin, View):
 
     def get(self, request):
         return render(request, "jobs/resume.html")
+
+
+def sitemap_modified(request, name=sitemaps.INDEX_NAME):
+    sitemap = Sitemap.objects.filter(name=name)
+    return sitemap.values_list("updated_at", flat=True).first()
+
+
+@condition(last_modified_func=sitemap_modified)
+def sitemap(request, name=sitemaps.INDEX_NAME):
+    """Serve a sitemap stored by the build_sitemaps command."""
+    sitemap = Sitemap.objects.filter(name=name)
+    content = sitemap.values_list("content", flat=True).first()
+    if content is None:
+        raise Http404("The sitemaps haven't been built yet.")
+    content_type = "application/gzip" if name.endswith(".gz") else "application/xml"
+    response = HttpResponse(bytes(content), content_type=content_type)
+    patch_cache_control(response, public=True, max_age=60 * 60)
+    return response
+
+
+def robots_txt(request):
+    """Point crawlers to the sitemap index."""
+    url = request.build_absolute_uri(reverse("jobs:sitemap-index"))
+    return HttpResponse(f"User-agent: *\nSitemap: {url}\n", content_type="text/plain")